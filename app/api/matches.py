@@ -3,10 +3,10 @@ Matches API: Fetches and serves upcoming/live Dota 2 matches.
 
 Uses PandaScore for match data and combines with our ML predictions.
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-from datetime import datetime, timedelta
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+from pydantic import BaseModel, TypeAdapter
 from loguru import logger
 
 from app.services.pandascore import pandascore_client
@@ -16,6 +16,11 @@ from app.core.config import settings
 from app.core.config import settings
 from app.core.rate_tracker import tracker
 import asyncio
+import functools
+import hashlib
+import time
+
+import numpy as np
 
 
 router = APIRouter(prefix="/api/v1/matches", tags=["matches"])
@@ -53,44 +58,65 @@ class MatchResponse(BaseModel):
 # Cache for matches (reduce API calls)
 _matches_cache = {
     "data": [],
-    "fetched_at": None,
+    "fetched_at": None,  # time.monotonic() of last refresh
     "ttl_seconds": 300,  # 5 minute cache
 }
 
 
+_matches_cache_lock = asyncio.Lock()
+
+
+def _matches_cache_fresh(now: float) -> bool:
+    """Check whether the matches cache is still within its TTL."""
+    fetched_at = _matches_cache["fetched_at"]
+    if fetched_at is None:
+        return False
+    return now - fetched_at < _matches_cache["ttl_seconds"]
+
+
 async def get_cached_matches(force_refresh: bool = False) -> List[dict]:
-    """Get matches with caching to protect API quota."""
-    now = datetime.utcnow()
+    """
+    Get matches with caching to protect API quota.
     
-    # Check cache validity
-    if not force_refresh and _matches_cache["fetched_at"]:
-        age = (now - _matches_cache["fetched_at"]).total_seconds()
-        if age < _matches_cache["ttl_seconds"]:
-            return _matches_cache["data"]
+    Refreshes are single-flight: when the cache expires, one caller fetches
+    from PandaScore while concurrent callers wait and reuse its result.
+    """
+    requested_at = time.monotonic()
     
-    # Check rate limit
-    if not tracker.can_call("pandascore"):
-        logger.warning("PandaScore quota limit reached, using cached data")
+    # Check cache validity
+    if not force_refresh and _matches_cache_fresh(requested_at):
         return _matches_cache["data"]
     
-    # Fetch fresh data
-    try:
-        matches = await pandascore_client.get_live_matches()
-        upcoming = await pandascore_client.get_upcoming_matches()
-        
-        all_matches = matches + upcoming
-        _matches_cache["data"] = all_matches
-        _matches_cache["fetched_at"] = now
-        
-        tracker.record_call("pandascore")
-        tracker.record_call("pandascore")  # Two calls made
+    async with _matches_cache_lock:
+        # Re-check: another caller may have refreshed while we waited
+        fetched_at = _matches_cache["fetched_at"]
+        if fetched_at is not None and fetched_at >= requested_at:
+            return _matches_cache["data"]
+        now = time.monotonic()
+        if not force_refresh and _matches_cache_fresh(now):
+            return _matches_cache["data"]
         
-        logger.info(f"Fetched {len(all_matches)} matches from PandaScore")
-        return all_matches
+        # Check and consume quota for the two calls below in one step
+        allowed, _ = await tracker.check_and_consume("pandascore", calls=2)
+        if not allowed:
+            logger.warning("PandaScore quota limit reached, using cached data")
+            return _matches_cache["data"]
         
-    except Exception as e:
-        logger.error(f"Failed to fetch matches: {e}")
-        return _matches_cache["data"]
+        # Fetch fresh data
+        try:
+            matches = await pandascore_client.get_live_matches()
+            upcoming = await pandascore_client.get_upcoming_matches()
+            
+            all_matches = matches + upcoming
+            _matches_cache["data"] = all_matches
+            _matches_cache["fetched_at"] = now
+            
+            logger.info(f"Fetched {len(all_matches)} matches from PandaScore")
+            return all_matches
+            
+        except Exception as e:
+            logger.error(f"Failed to fetch matches: {e}")
+            return _matches_cache["data"]
 
 
 def parse_match(match_data: dict) -> MatchResponse:
@@ -141,7 +167,19 @@ def parse_match(match_data: dict) -> MatchResponse:
     )
 
 
-async def get_pregame_prediction(team1_id: int, team2_id: int) -> MatchPrediction:
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def _mix64(x: int) -> int:
+    """SplitMix64 finalizer: cheap, stable integer hash (no str/hash seeding)."""
+    x = (x * 0x9E3779B97F4A7C15) & _MASK64
+    x ^= x >> 30
+    x = (x * 0xBF58476D1CE4E5B9) & _MASK64
+    x ^= x >> 27
+    return x
+
+
+def get_pregame_prediction(team1_id: int, team2_id: int) -> MatchPrediction:
     """Generate pre-game prediction using Stratz draft data."""
     # For now, use a simple baseline
     # In production, this would use team history and draft analysis
@@ -154,7 +192,8 @@ async def get_pregame_prediction(team1_id: int, team2_id: int) -> MatchPredictio
     try:
         # Try to get team stats from recent matches
         # This is a simplified version - full implementation would use Stratz
-        team1_prob = 0.5 + (hash(str(team1_id)) % 20 - 10) / 100  # Pseudo-randomize based on ID
+        h = _mix64(team1_id ^ _mix64(team2_id))
+        team1_prob = 0.5 + (h % 20 - 10) / 100  # Pseudo-randomize based on IDs
         team2_prob = 1 - team1_prob
         
     except Exception as e:
@@ -181,17 +220,20 @@ async def list_matches(
     raw_matches = await get_cached_matches()
     
     matches = []
-    for m in raw_matches[:limit]:
+    for m in raw_matches:
+        if len(matches) >= limit:
+            break
+        
+        # Filter by status if specified (before paying for model validation)
+        if status and m.get("status") != status:
+            continue
+        
         try:
             parsed = parse_match(m)
             
-            # Filter by status if specified
-            if status and parsed.status != status:
-                continue
-            
             # Add prediction
             if parsed.team1 and parsed.team2:
-                parsed.prediction = await get_pregame_prediction(
+                parsed.prediction = get_pregame_prediction(
                     parsed.team1.id, parsed.team2.id
                 )
             
@@ -225,7 +267,7 @@ async def get_match(match_id: str):
             parsed = parse_match(m)
             
             if parsed.team1 and parsed.team2:
-                parsed.prediction = await get_pregame_prediction(
+                parsed.prediction = get_pregame_prediction(
                     parsed.team1.id, parsed.team2.id
                 )
             
@@ -239,12 +281,30 @@ async def get_match(match_id: str):
 # =============================================================================
 
 from app.services.steam import get_steam_service, LiveMatch
-from app.ml.features import FeatureExtractor
-from app.ml.model import ModelWrapper
 
-# Initialize ML components for live predictions
-_feature_extractor = FeatureExtractor()
-_model = ModelWrapper()
+# ML components for live predictions are created on first use, so workers
+# that never serve live pro endpoints don't import XGBoost or load weights
+@functools.lru_cache(maxsize=1)
+def _get_extractor():
+    from app.ml.features import FeatureExtractor
+    return FeatureExtractor()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_model():
+    from app.ml.model import ModelWrapper
+    return ModelWrapper()
+
+
+# Per-match failure tracebacks go to a rotating file; enqueue=True writes
+# from loguru's worker thread so the event loop never blocks on disk I/O
+logger.add(
+    "debug_error.log",
+    level="ERROR",
+    enqueue=True,
+    rotation="10 MB",
+    delay=True,
+)
 
 
 class LiveProMatch(BaseModel):
@@ -282,6 +342,76 @@ class LiveProPrediction(BaseModel):
     edge_signal: str  # "RADIANT_VALUE", "DIRE_VALUE", "NO_EDGE"
 
 
+# Default draft context (Stratz API often returns 403 for live matches).
+# Shared read-only across every prediction; FeatureExtractor never mutates it.
+_DEFAULT_CONTEXT: Mapping[str, float] = MappingProxyType({
+    "draft_score_diff": 0.0,
+    "late_game_score_diff": 0.0,
+})
+
+# Cache for live predictions, keyed on quantized match state.
+# Steam state only changes every ~30s, so concurrent polls reuse the same score.
+_PRED_CACHE_TTL = 15  # seconds
+_PRED_CACHE_MAX_ENTRIES = 512
+_pred_cache: Dict[tuple, float] = {}
+_pred_cache_ts: Dict[tuple, float] = {}
+
+
+def _pred_cache_key(match: LiveMatch) -> tuple:
+    """Quantize live match state so near-identical snapshots share a prediction."""
+    return (match.match_id, match.game_time // 30, match.gold_diff // 100, match.xp_diff // 100)
+
+
+def _predict_radiant_batch(matches: List[LiveMatch]) -> List[float]:
+    """
+    Get Radiant win probabilities for several live matches.
+    
+    Cache hits skip inference; all misses are featurized and scored
+    together in a single model call.
+    """
+    now = time.monotonic()
+    probs: List[Optional[float]] = [None] * len(matches)
+    misses = []
+    
+    for i, match in enumerate(matches):
+        key = _pred_cache_key(match)
+        cached_at = _pred_cache_ts.get(key)
+        if cached_at is not None and now - cached_at < _PRED_CACHE_TTL:
+            probs[i] = _pred_cache[key]
+        else:
+            misses.append((i, key))
+    
+    if not misses:
+        return probs
+    
+    steam_service = get_steam_service()
+    
+    feature_inputs = [steam_service.to_feature_input(matches[i]) for i, _ in misses]
+    features = _get_extractor().extract_batch(feature_inputs, [_DEFAULT_CONTEXT] * len(misses))
+    scores = _get_model().predict_batch(features)
+    
+    for (i, key), score in zip(misses, scores):
+        radiant_prob = float(score)
+        probs[i] = radiant_prob
+        
+        # Evict oldest entry lazily once the cache is full
+        if len(_pred_cache) >= _PRED_CACHE_MAX_ENTRIES and key not in _pred_cache:
+            oldest = min(_pred_cache_ts, key=_pred_cache_ts.get)
+            _pred_cache.pop(oldest, None)
+            _pred_cache_ts.pop(oldest, None)
+        
+        _pred_cache[key] = radiant_prob
+        _pred_cache_ts[key] = now
+    
+    return probs
+
+
+def _predict_radiant(match: LiveMatch) -> float:
+    """Get Radiant win probability for a single live match."""
+    return _predict_radiant_batch([match])[0]
+
+
+@functools.lru_cache(maxsize=4096)
 def _format_game_time(seconds: int) -> str:
     """Format seconds to MM:SS."""
     mins = abs(seconds) // 60
@@ -303,6 +433,20 @@ def _get_confidence(game_time: int, prob: float) -> str:
         return "medium"
 
 
+_CONFIDENCE_LABELS = ("low", "medium", "high")
+
+
+def _get_confidence_batch(game_times: List[int], probs: List[float]) -> List[str]:
+    """Vectorized `_get_confidence` over a batch of matches."""
+    if not probs:
+        return []
+    t = np.asarray(game_times)
+    p = np.asarray(probs, dtype=np.float64)
+    # 0 = low (< 10 min), 1 = medium, 2 = high (late game + decisive probability)
+    codes = np.where(t < 600, 0, np.where((t >= 1200) & (np.abs(p - 0.5) > 0.2), 2, 1))
+    return [_CONFIDENCE_LABELS[c] for c in codes.tolist()]
+
+
 def _get_edge_signal(prob: float, market_prob: float = 0.5) -> str:
     """Determine if there's betting value."""
     edge = prob - market_prob
@@ -313,15 +457,88 @@ def _get_edge_signal(prob: float, market_prob: float = 0.5) -> str:
     return "NO_EDGE"
 
 
+@functools.lru_cache(maxsize=1024)
+def _norm_team_name(name: str) -> str:
+    """Normalize a team name for fuzzy matching (memoized across requests)."""
+    return name.lower().replace("team", "").strip()
+
+
+def _names_match(p: str, s: str) -> bool:
+    """Check if two normalized team names roughly match."""
+    return p in s or s in p
+
+
 def _fuzzy_match_teams(panda_name: str, steam_name: str) -> bool:
     """Check if team names roughly match."""
-    p = panda_name.lower().replace("team", "").strip()
-    s = steam_name.lower().replace("team", "").strip()
-    return p in s or s in p
+    return _names_match(_norm_team_name(panda_name), _norm_team_name(steam_name))
+
+
+def _find_steam_match(
+    team1_name: str,
+    team2_name: str,
+    steam_by_norm: Dict[str, List[LiveMatch]],
+    steam_norm_list: List[tuple],
+) -> Optional[LiveMatch]:
+    """
+    Find the Steam match played between two PandaScore teams.
+    
+    Tries an exact lookup on the normalized-name index first, then falls
+    back to a single substring scan over the precomputed Steam names.
+    """
+    p1n = _norm_team_name(team1_name)
+    p2n = _norm_team_name(team2_name)
+    
+    # Fast path: team 1 normalizes to exactly a Steam team name
+    for sm in steam_by_norm.get(p1n, ()):
+        r_norm = _norm_team_name(sm.radiant_team_name)
+        d_norm = _norm_team_name(sm.dire_team_name)
+        if _names_match(p2n, r_norm) or _names_match(p2n, d_norm):
+            return sm
+    
+    # Fallback: substring match on both teams
+    for sm, r_norm, d_norm in steam_norm_list:
+        t1_match = _names_match(p1n, r_norm) or _names_match(p1n, d_norm)
+        if t1_match and (_names_match(p2n, r_norm) or _names_match(p2n, d_norm)):
+            return sm
+    
+    return None
+
+
+# Cache for the assembled live pro list (inputs only change every ~30s)
+_live_pro_cache = {
+    "data": None,
+    "body": None,  # JSON bytes of "data", serialized once per refresh
+    "etag": None,  # Quoted content hash of "body"
+    "ts": 0.0,
+    "ttl": 20,  # seconds
+}
+_live_pro_lock = asyncio.Lock()
+_live_pro_adapter = TypeAdapter(List[LiveProMatch])
+
+
+def _live_pro_response(request: Request) -> Response:
+    """
+    Serve the cached live pro JSON body without re-validating the models.
+    
+    Clients that already hold the current payload get an empty 304.
+    """
+    etag = _live_pro_cache["etag"]
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={_live_pro_cache['ttl']}",
+    }
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=_live_pro_cache["body"], media_type="application/json", headers=headers)
 
 
 @router.get("/live/pro", response_model=List[LiveProMatch])
-async def get_live_pro_matches():
+async def get_live_pro_matches(request: Request):
     """
     Get live pro matches using Hybrid Data Source:
     1. PandaScore for high-quality metadata (Leagues, Teams, Series)
@@ -329,25 +546,57 @@ async def get_live_pro_matches():
     
     This ensures we only show legitimate Pro matches (filtered by PandaScore)
     while still providing the real-time edge from Steam data.
+    
+    The assembled list is cached briefly; concurrent requests on a cold
+    cache wait for a single rebuild instead of each fanning out.
     """
     # Get steam service at request time (not at module import time)
     steam_service = get_steam_service()
     
     if not steam_service.is_available:
         raise HTTPException(status_code=503, detail="Steam API not configured")
+    
+    if _live_pro_cache["data"] is not None and time.monotonic() - _live_pro_cache["ts"] < _live_pro_cache["ttl"]:
+        return _live_pro_response(request)
+    
+    async with _live_pro_lock:
+        # Another request may have refreshed the cache while we waited
+        if _live_pro_cache["data"] is not None and time.monotonic() - _live_pro_cache["ts"] < _live_pro_cache["ttl"]:
+            return _live_pro_response(request)
+        
+        results = await _build_live_pro_matches(steam_service)
+        if results is None:
+            return []
+        
+        _live_pro_cache["data"] = results
+        _live_pro_cache["body"] = _live_pro_adapter.dump_json(results)
+        _live_pro_cache["etag"] = '"%s"' % hashlib.blake2b(_live_pro_cache["body"], digest_size=8).hexdigest()
+        _live_pro_cache["ts"] = time.monotonic()
+        return _live_pro_response(request)
+
 
+async def _build_live_pro_matches(steam_service) -> Optional[List[LiveProMatch]]:
+    """Fetch, merge and score live pro matches. Returns None if all sources fail."""
     # 1. Fetch from all sources in parallel (Steam + OpenDota for verification + PandaScore)
     steam_task = steam_service.get_live_matches(use_cache=True)
     opendota_pro_task = opendota_client.get_recent_pro_matches(use_cache=True)
     panda_task = pandascore_client.get_live_matches()
     
-    try:
-        steam_matches, pro_matches, raw_panda_matches = await asyncio.gather(
-            steam_task, opendota_pro_task, panda_task
-        )
-    except Exception as e:
-        logger.error(f"Failed to fetch live matches: {e}")
-        return []
+    fetched = await asyncio.gather(
+        steam_task, opendota_pro_task, panda_task, return_exceptions=True
+    )
+    
+    # Degrade gracefully: a failed source contributes no matches
+    if all(isinstance(x, Exception) for x in fetched):
+        logger.error(f"Failed to fetch live matches: {fetched[0]}")
+        return None
+    
+    steam_matches, pro_matches, raw_panda_matches = [
+        [] if isinstance(x, Exception) else x for x in fetched
+    ]
+    for source, x in zip(("Steam", "OpenDota", "PandaScore"), fetched):
+        if isinstance(x, Exception):
+            logger.warning(f"{source} live fetch failed: {x}")
     
     # Build set of verified league IDs from OpenDota /proMatches
     # These are leagues that have had recent professional matches
@@ -360,9 +609,21 @@ async def get_live_pro_matches():
     logger.info(f"OpenDota verification: {len(verified_league_ids)} verified league IDs")
     
     # 2. Process PandaScore matches (Primary Source)
-    results = []
+    # Matched Steam games are collected first and scored in one batch below.
+    pending = []  # (steam_match, league_name)
     matched_steam_ids = set()
     
+    # Index Steam matches by normalized team name (computed once per request)
+    steam_by_norm: Dict[str, List[LiveMatch]] = {}
+    steam_norm_list = []
+    for sm in steam_matches:
+        r_norm = _norm_team_name(sm.radiant_team_name)
+        d_norm = _norm_team_name(sm.dire_team_name)
+        steam_by_norm.setdefault(r_norm, []).append(sm)
+        if d_norm != r_norm:
+            steam_by_norm.setdefault(d_norm, []).append(sm)
+        steam_norm_list.append((sm, r_norm, d_norm))
+    
     for pm in raw_panda_matches:
         try:
             # Parse PandaScore match using existing logic
@@ -371,63 +632,17 @@ async def get_live_pro_matches():
             # Try to find corresponding Steam match
             steam_match = None
             
-            # Strategy A: Filter steam matches by team names
+            # Strategy A: Look up steam matches by team names (fuzzy name match)
             if parsed_pm.team1 and parsed_pm.team2:
-                p_t1 = parsed_pm.team1.name
-                p_t2 = parsed_pm.team2.name
-                
-                for sm in steam_matches:
-                    # Check match identifiers (fuzzy name match)
-                    t1_match = _fuzzy_match_teams(p_t1, sm.radiant_team_name) or _fuzzy_match_teams(p_t1, sm.dire_team_name)
-                    t2_match = _fuzzy_match_teams(p_t2, sm.radiant_team_name) or _fuzzy_match_teams(p_t2, sm.dire_team_name)
-                    
-                    if t1_match and t2_match:
-                        steam_match = sm
-                        break
+                steam_match = _find_steam_match(
+                    parsed_pm.team1.name, parsed_pm.team2.name,
+                    steam_by_norm, steam_norm_list,
+                )
             
-            # Build result
             if steam_match:
                 matched_steam_ids.add(steam_match.match_id)
-                
-                # Use Metadata from PandaScore, Stats from Steam
-                feature_input = steam_service.to_feature_input(steam_match)
-                
-                # Use default draft context (Stratz API often returns 403 for live matches)
-                context = {
-                    "draft_score_diff": 0.0,
-                    "late_game_score_diff": 0.0
-                }
-                
-                features = _feature_extractor.extract(feature_input, context=context)
-                radiant_prob = _model.predict(features)
-                
-                # Determine if PandaScore teams match Steam sides (Radiant/Dire)
-                # Default assumption: Steam Radiant = Panda Team 1? Not guaranteed.
-                # We need to map them.
-                
-                # Simple heuristic: If Panda Team1 matches Steam Radiant Name -> Team1 is Radiant
-                is_t1_radiant = _fuzzy_match_teams(parsed_pm.team1.name, steam_match.radiant_team_name)
-                
-                # Use Steam Names if available (they are live from lobby)
-                radiant_name = steam_match.radiant_team_name
-                dire_name = steam_match.dire_team_name
-                
-                results.append(LiveProMatch(
-                    match_id=steam_match.match_id,  # Use Steam ID for live tracking
-                    league_name=parsed_pm.league_name or steam_match.league_name,  # Prefer Panda League Name
-                    radiant_team=radiant_name,
-                    dire_team=dire_name,
-                    game_time=steam_match.game_time,
-                    game_time_formatted=_format_game_time(steam_match.game_time),
-                    radiant_score=steam_match.radiant.score,
-                    dire_score=steam_match.dire.score,
-                    gold_diff=steam_match.gold_diff,
-                    xp_diff=steam_match.xp_diff,
-                    radiant_win_prob=round(radiant_prob, 4),
-                    dire_win_prob=round(1 - radiant_prob, 4),
-                    confidence=_get_confidence(steam_match.game_time, radiant_prob),
-                    spectators=steam_match.spectators,
-                ))
+                # Use Metadata from PandaScore (prefer Panda League Name), Stats from Steam
+                pending.append((steam_match, parsed_pm.league_name or steam_match.league_name))
             else:
                 # PandaScore match but no Steam data (maybe steam delay or names mismatch)
                 # Show it anyway? No, user wants LIVE stats. 
@@ -437,23 +652,12 @@ async def get_live_pro_matches():
         except Exception as e:
             # Fail gracefully for individual matches
             match_id = pm.get("id", "unknown")
-            logger.error(f"Error processing match {match_id}: {e}")
-            import traceback
-            with open("debug_error.log", "a") as f:
-                f.write(f"Timestamp: {datetime.utcnow()}\n")
-                f.write(f"Error processing PandaScore match {match_id}: {e}\n")
-                f.write(traceback.format_exc() + "\n\n")
+            logger.opt(exception=True).error("Error processing match {}: {}", match_id, e)
             continue
 
     # 3. Add Steam Matches verified by OpenDota (filters out unknown amateur games)
     for sm in steam_matches:
         if sm.match_id not in matched_steam_ids:
-            # Verify match is from a known pro league using OpenDota
-            try:
-                match_id_int = int(sm.match_id)
-            except ValueError:
-                match_id_int = 0
-            
             is_verified = sm.league_id in verified_league_ids  # League ID verification via /proMatches
             
             if not is_verified:
@@ -461,45 +665,35 @@ async def get_live_pro_matches():
                 logger.debug(f"Skipping unverified match: {sm.radiant_team_name} vs {sm.dire_team_name}")
                 continue
             
-            # Process verified Steam match
-            try:
-                feature_input = steam_service.to_feature_input(sm)
-                
-                # Use default draft context (Stratz often fails for live matches)
-                context = {
-                    "draft_score_diff": 0.0,
-                    "late_game_score_diff": 0.0
-                }
-
-                features = _feature_extractor.extract(feature_input, context=context)
-                radiant_prob = _model.predict(features)
-                
-                # Use OpenDota league name if available, otherwise Steam
-                league_name = opendota_league_names.get(sm.league_id, sm.league_name)
-                
-                results.append(LiveProMatch(
-                    match_id=sm.match_id,
-                    league_name=league_name,
-                    radiant_team=sm.radiant_team_name,
-                    dire_team=sm.dire_team_name,
-                    game_time=sm.game_time,
-                    game_time_formatted=_format_game_time(sm.game_time),
-                    radiant_score=sm.radiant.score,
-                    dire_score=sm.dire.score,
-                    gold_diff=sm.gold_diff,
-                    xp_diff=sm.xp_diff,
-                    radiant_win_prob=round(radiant_prob, 4),
-                    dire_win_prob=round(1 - radiant_prob, 4),
-                    confidence=_get_confidence(sm.game_time, radiant_prob),
-                    spectators=sm.spectators,
-                ))
-            except Exception as e:
-                import traceback
-                with open("debug_error.log", "a") as f:
-                    f.write(f"Error processing {sm.match_id}: {e}\n")
-                    f.write(traceback.format_exc() + "\n")
-                logger.error(f"Error processing live match {sm.match_id}: {e}")
-                continue
+            # Use OpenDota league name if available, otherwise Steam
+            pending.append((sm, opendota_league_names.get(sm.league_id, sm.league_name)))
+    
+    # 4. Score every pending match in a single model call
+    radiant_probs = _predict_radiant_batch([sm for sm, _ in pending])
+    confidences = _get_confidence_batch([sm.game_time for sm, _ in pending], radiant_probs)
+    
+    results = []
+    for (sm, league_name), radiant_prob, confidence in zip(pending, radiant_probs, confidences):
+        try:
+            results.append(LiveProMatch(
+                match_id=sm.match_id,  # Use Steam ID for live tracking
+                league_name=league_name,
+                radiant_team=sm.radiant_team_name,  # Steam names are live from lobby
+                dire_team=sm.dire_team_name,
+                game_time=sm.game_time,
+                game_time_formatted=_format_game_time(sm.game_time),
+                radiant_score=sm.radiant.score,
+                dire_score=sm.dire.score,
+                gold_diff=sm.gold_diff,
+                xp_diff=sm.xp_diff,
+                radiant_win_prob=round(radiant_prob, 4),
+                dire_win_prob=round(1 - radiant_prob, 4),
+                confidence=confidence,
+                spectators=sm.spectators,
+            ))
+        except Exception as e:
+            logger.opt(exception=True).error("Error processing live match {}: {}", sm.match_id, e)
+            continue
 
     # Sort by spectators
     results.sort(key=lambda x: x.spectators, reverse=True)
@@ -530,9 +724,7 @@ async def get_live_pro_prediction(match_id: str):
         raise HTTPException(status_code=404, detail="Live match not found")
     
     # Run ML prediction
-    feature_input = steam_service.to_feature_input(match)
-    features = _feature_extractor.extract(feature_input)
-    radiant_prob = _model.predict(features)
+    radiant_prob = _predict_radiant(match)
     
     return LiveProPrediction(
         match_id=match.match_id,
@@ -594,9 +786,7 @@ async def get_match_ai_analysis(match_id: str):
         raise HTTPException(status_code=404, detail="Live match not found")
     
     # Get ML prediction
-    feature_input = steam_service.to_feature_input(match)
-    features = _feature_extractor.extract(feature_input)
-    radiant_prob = _model.predict(features)
+    radiant_prob = _predict_radiant(match)
     edge_signal = _get_edge_signal(radiant_prob)
     
     # Fetch team stats from OpenDota (parallel)
@@ -606,26 +796,18 @@ async def get_match_ai_analysis(match_id: str):
         dire_team_id = getattr(match.dire, 'team_id', 0) or 0
         
         if radiant_team_id > 0 or dire_team_id > 0:
-            tasks = []
-            if radiant_team_id > 0:
-                tasks.append(opendota_client.get_team_stats(radiant_team_id))
-                tasks.append(opendota_client.get_team_recent_form(radiant_team_id))
-            if dire_team_id > 0:
-                tasks.append(opendota_client.get_team_stats(dire_team_id))
-                tasks.append(opendota_client.get_team_recent_form(dire_team_id))
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            sides = [
+                (side, team_id)
+                for side, team_id in (("radiant", radiant_team_id), ("dire", dire_team_id))
+                if team_id > 0
+            ]
+            profiles = await asyncio.gather(
+                *(opendota_client.get_team_profile(team_id) for _, team_id in sides),
+                return_exceptions=True,
+            )
             
-            idx = 0
-            if radiant_team_id > 0:
-                radiant_stats = results[idx] if not isinstance(results[idx], Exception) else {}
-                radiant_form = results[idx+1] if not isinstance(results[idx+1], Exception) else {}
-                team_stats["radiant"] = {**radiant_stats, **radiant_form}
-                idx += 2
-            if dire_team_id > 0:
-                dire_stats = results[idx] if not isinstance(results[idx], Exception) else {}
-                dire_form = results[idx+1] if not isinstance(results[idx+1], Exception) else {}
-                team_stats["dire"] = {**dire_stats, **dire_form}
+            for (side, _), profile in zip(sides, profiles):
+                team_stats[side] = profile if not isinstance(profile, Exception) else {}
     except Exception as e:
         logger.debug(f"Failed to fetch team stats: {e}")
     
@@ -5,11 +5,26 @@ This module provides backward compatibility with the old queue-based system
 while transitioning to the new StateManager-based architecture.
 """
 import asyncio
-from typing import Optional
+from typing import Any, Optional
 
 # Legacy: Global queue for in-memory processing
 # Initialized in main.py startup
 queue: Optional[asyncio.Queue] = None
 
+
+async def drain_latest(q: asyncio.Queue) -> Any:
+    """
+    Wait for a tick, then drain everything queued behind it.
+    
+    Returns only the newest item: older ticks are stale by the time they
+    would be processed, so bursts are shed instead of building a backlog.
+    """
+    latest = await q.get()
+    while True:
+        try:
+            latest = q.get_nowait()
+        except asyncio.QueueEmpty:
+            return latest
+
 # New: Import StateManager singleton for the Lite Monolith architecture
 from app.core.state import state_manager, StateManager
@@ -0,0 +1,54 @@
+-- Atomic check-and-consume over sliding-window API usage, shared by every worker.
+--
+-- KEYS[1..3]  sorted sets for the monthly, daily and minute windows
+-- ARGV[1]     unique member prefix for this call
+-- ARGV[2]     number of calls to consume
+-- ARGV[3..5]  blocking limits for the monthly, daily and minute windows (0 = no limit)
+--
+-- Calls are only recorded when every window has room for them.
+-- Returns {allowed, remaining, retry_after_ms}
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local member = ARGV[1]
+local cost = tonumber(ARGV[2])
+local windows = {2592000000, 86400000, 60000}  -- 30 days, 1 day, 1 minute
+
+local allowed = 1
+local remaining = -1
+local retry_after = 0
+
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - windows[i])
+
+    local limit = tonumber(ARGV[i + 2])
+    if limit > 0 then
+        local count = redis.call('ZCARD', key)
+        local left = limit - count
+        if left < cost then
+            allowed = 0
+            -- Room frees up once the oldest call in this window expires
+            local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+            if oldest[2] then
+                retry_after = math.max(retry_after, tonumber(oldest[2]) + windows[i] - now)
+            end
+        end
+        if remaining < 0 or left < remaining then
+            remaining = left
+        end
+    end
+end
+
+if allowed == 1 then
+    for i, key in ipairs(KEYS) do
+        for j = 1, cost do
+            redis.call('ZADD', key, now, member .. ':' .. j)
+        end
+        redis.call('PEXPIRE', key, windows[i])
+    end
+    if remaining >= 0 then
+        remaining = remaining - cost
+    end
+end
+
+return {allowed, remaining, retry_after}
@@ -6,23 +6,66 @@ Tracks usage for:
 - PandaScore: 1,000/month
 - Stratz: 10,000/month
 
-Persists counts to file for cross-session tracking.
+When Redis is configured, quota checks and call recording happen in one
+atomic Lua script over shared sliding windows, so every worker sees the
+same usage.
+Local counts are snapshotted to file in the background for cross-session
+tracking.
 """
+import asyncio
 import json
-from datetime import datetime, date
+import math
+import os
+import time
+import uuid
+from datetime import datetime, date, timedelta, timezone
 from pathlib import Path
-from typing import Dict, Optional
-from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+import orjson
 from loguru import logger
 
+from app.core.redis import RedisClient
 
-@dataclass
+
+RATE_LIMIT_SCRIPT = (Path(__file__).parent / "rate_limit.lua").read_text()
+
+WARNING_THRESHOLD = 0.80
+BLOCK_THRESHOLD = 0.95
+
+# (ISO date, epoch seconds of the next local midnight)
+_today_cache = ("", 0.0)
+
+
+def _today() -> str:
+    """Today's ISO date, recomputed only when the local day rolls over."""
+    global _today_cache
+    if time.time() >= _today_cache[1]:
+        today = date.today()
+        next_midnight = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+        _today_cache = (today.isoformat(), next_midnight)
+    return _today_cache[0]
+
+
+@dataclass(slots=True)
 class APIQuota:
     """Quota configuration for an API."""
     name: str
     monthly_limit: int
     daily_limit: Optional[int] = None
     minute_limit: Optional[int] = None
+    # Integer call counts at which the thresholds trip (0 = no daily limit)
+    monthly_warn: int = field(init=False)
+    monthly_block: int = field(init=False)
+    daily_warn: int = field(init=False)
+    daily_block: int = field(init=False)
+
+    def __post_init__(self):
+        # ceil keeps `calls >= block` equivalent to `calls >= limit * threshold`
+        self.monthly_warn = math.ceil(self.monthly_limit * WARNING_THRESHOLD)
+        self.monthly_block = math.ceil(self.monthly_limit * BLOCK_THRESHOLD)
+        self.daily_warn = math.ceil(self.daily_limit * WARNING_THRESHOLD) if self.daily_limit else 0
+        self.daily_block = math.ceil(self.daily_limit * BLOCK_THRESHOLD) if self.daily_limit else 0
 
 
 # API Configurations
@@ -46,14 +89,41 @@ API_QUOTAS = {
 }
 
 
-@dataclass
+class TokenBucket:
+    """
+    Async token bucket: bursts up to `capacity` calls, refilling evenly over `period` seconds.
+    
+    Waiters are served in arrival order.
+    """
+    
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period  # tokens per second
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait for and take one token."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass(slots=True)
 class UsageStats:
     """Usage statistics for an API."""
     total_calls: int = 0
     daily_calls: Dict[str, int] = field(default_factory=dict)
     last_call: Optional[str] = None
     last_minute_calls: int = 0
-    last_minute_timestamp: Optional[str] = None
+    last_minute_ts: float = 0.0  # Epoch seconds when the current minute window began
 
 
 class RateLimitTracker:
@@ -68,11 +138,17 @@ class RateLimitTracker:
     """
     
     DATA_FILE = Path("data/rate_limits.json")
-    WARNING_THRESHOLD = 0.80
-    BLOCK_THRESHOLD = 0.95
+    WARNING_THRESHOLD = WARNING_THRESHOLD
+    BLOCK_THRESHOLD = BLOCK_THRESHOLD
+    SNAPSHOT_INTERVAL = 60  # seconds between background file snapshots
+    DAILY_HISTORY_MAX = 40  # Prune daily_calls once it holds more days than this
+    DAILY_HISTORY_KEEP = 35  # Days of daily_calls kept after pruning
     
     def __init__(self):
         self._usage: Dict[str, UsageStats] = {}
+        self._dirty = False
+        # (epoch second, status) so dashboard polls within a second share one build
+        self._status_cache: Optional[Tuple[int, Dict[str, Dict]]] = None
         self._load()
     
     def _load(self):
@@ -84,6 +160,10 @@ class RateLimitTracker:
                 with open(self.DATA_FILE, "r") as f:
                     data = json.load(f)
                     for api, stats in data.items():
+                        # Older snapshots stored the minute window as an ISO string
+                        legacy_ts = stats.pop("last_minute_timestamp", None)
+                        if legacy_ts:
+                            stats["last_minute_ts"] = datetime.fromisoformat(legacy_ts).replace(tzinfo=timezone.utc).timestamp()
                         self._usage[api] = UsageStats(**stats)
             except Exception as e:
                 logger.warning(f"Failed to load rate limits: {e}")
@@ -93,15 +173,49 @@ class RateLimitTracker:
             if api not in self._usage:
                 self._usage[api] = UsageStats()
     
-    def _save(self):
-        """Save usage data to file."""
+    @staticmethod
+    def _stats_to_dict(stats: UsageStats) -> Dict:
+        """Flat copy of UsageStats (cheaper than dataclasses.asdict's deep copy)."""
+        return {
+            "total_calls": stats.total_calls,
+            "daily_calls": dict(stats.daily_calls),
+            "last_call": stats.last_call,
+            "last_minute_calls": stats.last_minute_calls,
+            "last_minute_ts": stats.last_minute_ts,
+        }
+    
+    def _snapshot(self) -> Dict[str, Dict]:
+        """Copy usage data into plain dicts for writing."""
+        return {api: self._stats_to_dict(stats) for api, stats in self._usage.items()}
+    
+    def _write(self, data: Dict[str, Dict]):
+        """Write a usage snapshot to file atomically (temp file + rename)."""
         try:
-            data = {api: asdict(stats) for api, stats in self._usage.items()}
-            with open(self.DATA_FILE, "w") as f:
-                json.dump(data, f, indent=2)
+            tmp_path = self.DATA_FILE.with_suffix(".tmp")
+            tmp_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            os.replace(tmp_path, self.DATA_FILE)
         except Exception as e:
             logger.error(f"Failed to save rate limits: {e}")
     
+    def _save(self):
+        """Save usage data to file."""
+        self._write(self._snapshot())
+        self._dirty = False
+    
+    def flush(self):
+        """Persist usage now if anything changed since the last snapshot."""
+        if self._dirty:
+            self._save()
+    
+    async def snapshot_loop(self):
+        """Periodically persist usage off the event loop (cold-start snapshot)."""
+        while True:
+            await asyncio.sleep(self.SNAPSHOT_INTERVAL)
+            if self._dirty:
+                data = self._snapshot()
+                self._dirty = False
+                await asyncio.to_thread(self._write, data)
+    
     def can_call(self, api: str) -> bool:
         """
         Check if an API call is allowed.
@@ -116,28 +230,25 @@ class RateLimitTracker:
         
         quota = API_QUOTAS[api]
         stats = self._usage.get(api, UsageStats())
-        today = date.today().isoformat()
+        today = _today()
         
         # Check monthly
-        if stats.total_calls >= quota.monthly_limit * self.BLOCK_THRESHOLD:
+        if stats.total_calls >= quota.monthly_block:
             logger.error(f"🚫 {quota.name} BLOCKED: Monthly limit reached ({stats.total_calls}/{quota.monthly_limit})")
             return False
         
         # Check daily
         daily_calls = stats.daily_calls.get(today, 0)
-        if quota.daily_limit and daily_calls >= quota.daily_limit * self.BLOCK_THRESHOLD:
+        if quota.daily_limit and daily_calls >= quota.daily_block:
             logger.error(f"🚫 {quota.name} BLOCKED: Daily limit reached ({daily_calls}/{quota.daily_limit})")
             return False
         
         # Check minute (for OpenDota)
         if quota.minute_limit:
-            now = datetime.utcnow()
-            if stats.last_minute_timestamp:
-                last_min = datetime.fromisoformat(stats.last_minute_timestamp)
-                if (now - last_min).total_seconds() < 60:
-                    if stats.last_minute_calls >= quota.minute_limit:
-                        logger.warning(f"⏳ {quota.name}: Minute limit reached, wait...")
-                        return False
+            if time.time() - stats.last_minute_ts < 60:
+                if stats.last_minute_calls >= quota.minute_limit:
+                    logger.warning(f"⏳ {quota.name}: Minute limit reached, wait...")
+                    return False
         
         return True
     
@@ -148,7 +259,7 @@ class RateLimitTracker:
         
         stats = self._usage[api]
         now = datetime.utcnow()
-        today = date.today().isoformat()
+        today = _today()
         
         # Update totals
         stats.total_calls += 1
@@ -159,24 +270,77 @@ class RateLimitTracker:
             stats.daily_calls[today] = 0
         stats.daily_calls[today] += 1
         
+        # Keep the daily history bounded (ISO dates sort chronologically)
+        if len(stats.daily_calls) > self.DAILY_HISTORY_MAX:
+            cutoff = (date.today() - timedelta(days=self.DAILY_HISTORY_KEEP)).isoformat()
+            stats.daily_calls = {k: v for k, v in stats.daily_calls.items() if k >= cutoff}
+        
         # Update minute tracking
-        if stats.last_minute_timestamp:
-            last_min = datetime.fromisoformat(stats.last_minute_timestamp)
-            if (now - last_min).total_seconds() >= 60:
-                stats.last_minute_calls = 1
-                stats.last_minute_timestamp = now.isoformat()
-            else:
-                stats.last_minute_calls += 1
-        else:
+        now_ts = time.time()
+        if now_ts - stats.last_minute_ts >= 60:
             stats.last_minute_calls = 1
-            stats.last_minute_timestamp = now.isoformat()
+            stats.last_minute_ts = now_ts
+        else:
+            stats.last_minute_calls += 1
         
         # Check warnings
         self._check_warnings(api)
         
-        # Save periodically (every 10 calls)
-        if stats.total_calls % 10 == 0:
-            self._save()
+        # Persisted by snapshot_loop, not on the hot path
+        self._dirty = True
+        self._status_cache = None
+    
+    async def check_and_consume(self, api: str, calls: int = 1) -> Tuple[bool, Dict[str, int]]:
+        """
+        Atomically check quota and record `calls` API calls if allowed.
+        
+        With Redis this is a single Lua evaluation against the shared
+        sliding windows; otherwise it falls back to the local counters.
+        
+        Returns:
+            (allowed, {"remaining": calls left in the tightest window or -1,
+                       "retry_after": seconds until a blocked window frees up})
+        """
+        if api not in API_QUOTAS:
+            return True, {"remaining": -1, "retry_after": 0}
+        
+        quota = API_QUOTAS[api]
+        result = await RedisClient.run_script(
+            RATE_LIMIT_SCRIPT,
+            keys=self._redis_keys(api),
+            args=[
+                uuid.uuid4().hex,
+                calls,
+                quota.monthly_block,
+                quota.daily_block,
+                quota.minute_limit or 0,
+            ],
+        )
+        
+        if result is None:
+            # Redis unavailable: local, per-process tracking
+            if not self.can_call(api):
+                return False, {"remaining": 0, "retry_after": 0}
+            for _ in range(calls):
+                self.record_call(api)
+            return True, {"remaining": -1, "retry_after": 0}
+        
+        allowed, remaining, retry_after_ms = (int(x) for x in result)
+        info = {"remaining": remaining, "retry_after": -(-retry_after_ms // 1000)}
+        
+        if not allowed:
+            logger.warning(f"🚫 {quota.name} BLOCKED: shared quota reached, retry in {info['retry_after']}s")
+            return False, info
+        
+        # Mirror locally so status() and snapshots reflect this worker's usage
+        for _ in range(calls):
+            self.record_call(api)
+        return True, info
+    
+    @staticmethod
+    def _redis_keys(api: str) -> List[str]:
+        """Sorted-set keys for the monthly, daily and minute windows."""
+        return [f"ratelimit:{api}:month", f"ratelimit:{api}:day", f"ratelimit:{api}:minute"]
     
     def _check_warnings(self, api: str):
         """Log warnings at threshold."""
@@ -185,24 +349,27 @@ class RateLimitTracker:
             
         quota = API_QUOTAS[api]
         stats = self._usage[api]
-        today = date.today().isoformat()
+        today = _today()
         
         # Monthly warning
-        usage_pct = stats.total_calls / quota.monthly_limit
-        if usage_pct >= self.WARNING_THRESHOLD:
+        if stats.total_calls >= quota.monthly_warn:
+            usage_pct = stats.total_calls / quota.monthly_limit
             logger.warning(f"⚠️ {quota.name}: {usage_pct:.0%} of monthly quota used!")
         
         # Daily warning
         daily_calls = stats.daily_calls.get(today, 0)
-        if quota.daily_limit:
+        if quota.daily_limit and daily_calls >= quota.daily_warn:
             daily_pct = daily_calls / quota.daily_limit
-            if daily_pct >= self.WARNING_THRESHOLD:
-                logger.warning(f"⚠️ {quota.name}: {daily_pct:.0%} of daily quota used!")
+            logger.warning(f"⚠️ {quota.name}: {daily_pct:.0%} of daily quota used!")
     
     def status(self) -> Dict[str, Dict]:
-        """Get current usage status for all APIs."""
+        """Get current usage status for all APIs (cached for up to a second)."""
+        epoch_sec = int(time.time())
+        if self._status_cache and self._status_cache[0] == epoch_sec:
+            return self._status_cache[1]
+        
         result = {}
-        today = date.today().isoformat()
+        today = _today()
         
         for api, quota in API_QUOTAS.items():
             stats = self._usage.get(api, UsageStats())
@@ -219,18 +386,20 @@ class RateLimitTracker:
                 "can_call": self.can_call(api),
             }
         
+        self._status_cache = (epoch_sec, result)
         return result
     
     def reset_monthly(self):
         """Reset monthly counters (call on month change)."""
         for stats in self._usage.values():
             stats.total_calls = 0
+        self._status_cache = None
         self._save()
         logger.info("🔄 Monthly rate limits reset")
     
     def reset_daily(self, api: Optional[str] = None):
         """Reset daily counters."""
-        today = date.today().isoformat()
+        today = _today()
         
         if api:
             if api in self._usage:
@@ -239,6 +408,7 @@ class RateLimitTracker:
             for stats in self._usage.values():
                 stats.daily_calls[today] = 0
         
+        self._status_cache = None
         self._save()
 
 
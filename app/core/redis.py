@@ -1,10 +1,16 @@
 import redis.asyncio as redis
-from typing import Optional
+from redis.exceptions import NoScriptError
+from typing import Dict, List, Optional, Sequence
 from app.core.config import settings
 from loguru import logger
 
 class RedisClient:
     _instance: Optional[redis.Redis] = None
+    _script_shas: Dict[str, str] = {}  # script source -> SHA from SCRIPT LOAD
+
+    # Shared pool so concurrent coroutines don't serialize on one socket
+    MAX_CONNECTIONS = 64
+    HEALTH_CHECK_INTERVAL = 30  # seconds
 
     @classmethod
     def get_instance(cls) -> redis.Redis:
@@ -14,11 +20,16 @@ class RedisClient:
                 return None
             
             try:
-                cls._instance = redis.from_url(
-                    settings.REDIS_URL, 
-                    encoding="utf-8", 
-                    decode_responses=True
+                pool = redis.ConnectionPool.from_url(
+                    settings.REDIS_URL,
+                    encoding="utf-8",
+                    decode_responses=True,
+                    max_connections=cls.MAX_CONNECTIONS,
+                    socket_keepalive=True,
+                    health_check_interval=cls.HEALTH_CHECK_INTERVAL,
                 )
+                # from_pool hands pool ownership to the client, so close() disconnects it
+                cls._instance = redis.Redis.from_pool(pool)
                 logger.info("Redis client initialized")
             except Exception as e:
                 logger.error(f"Failed to connect to Redis: {e}")
@@ -28,10 +39,47 @@ class RedisClient:
     @classmethod
     async def close(cls):
         if cls._instance:
-            await cls._instance.close()
+            await cls._instance.aclose()
             cls._instance = None
+            cls._script_shas.clear()
             logger.info("Redis connection closed")
 
+    @classmethod
+    async def load_script(cls, source: str) -> Optional[str]:
+        """SCRIPT LOAD a Lua script once and cache its SHA."""
+        r = cls.get_instance()
+        if not r: return None
+        try:
+            sha = await r.script_load(source)
+            cls._script_shas[source] = sha
+            return sha
+        except Exception as e:
+            logger.error(f"Redis script load error: {e}")
+            return None
+
+    @classmethod
+    async def run_script(cls, source: str, keys: Sequence[str], args: Sequence) -> Optional[List]:
+        """
+        Run a Lua script by SHA, loading it on first use.
+        
+        Reloads transparently if Redis was restarted and lost the script.
+        Returns None when Redis is unavailable.
+        """
+        r = cls.get_instance()
+        if not r: return None
+        try:
+            sha = cls._script_shas.get(source) or await cls.load_script(source)
+            if not sha: return None
+            try:
+                return await r.evalsha(sha, len(keys), *keys, *args)
+            except NoScriptError:
+                sha = await cls.load_script(source)
+                if not sha: return None
+                return await r.evalsha(sha, len(keys), *keys, *args)
+        except Exception as e:
+            logger.error(f"Redis script error: {e}")
+            return None
+
     @classmethod
     async def get(cls, key: str) -> Optional[str]:
         r = cls.get_instance()
@@ -5,13 +5,25 @@ This module holds the shared state between the Ingestion API and the Worker.
 It replaces Redis for the "Lite" version of Chronosphere.
 """
 import asyncio
+import bisect
+from array import array
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 import math
 import random
+import struct
 
-@dataclass
+# Binary broadcast frame, little-endian (74 bytes):
+#   match_id (int64, -1 if not numeric), game_time, gold_diff, xp_diff (int32),
+#   networth_velocity, model_win_probability, market_implied_probability,
+#   market_odds_radiant, mispricing_index, draft_radiant_score (float64),
+#   series_score_diff (int32), is_verified, is_mock_odds (bool)
+# An empty frame means there is no current match.
+BROADCAST_FRAME = struct.Struct("<qiiiddddddi??")
+
+
+@dataclass(slots=True)
 class DraftContext:
     """Pre-match context from Stratz."""
     radiant_draft_score: float = 0.5  # Win rate of draft
@@ -20,7 +32,7 @@ class DraftContext:
     dire_late_game_score: float = 0.5
 
 
-@dataclass
+@dataclass(slots=True)
 class MarketOdds:
     """Live odds from PandaScore."""
     radiant_odds: float = 1.9  # Decimal odds
@@ -30,7 +42,7 @@ class MarketOdds:
     is_mock: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class LiveGameState:
     """Real-time game state from GSI."""
     match_id: Optional[str] = None
@@ -47,30 +59,45 @@ class LiveGameState:
     networth_gini: float = 0.0  # Concentration of gold
     buyback_power_ratio: float = 0.0
     
-    # History for velocity calculation
-    gold_history: List[tuple] = field(default_factory=list)  # [(time, gold_diff), ...]
+    # History for velocity calculation: parallel (time, gold_diff) arrays in
+    # time order. Entries before _head are expired and compacted lazily.
+    _times: array = field(default_factory=lambda: array('i'), repr=False)
+    _diffs: array = field(default_factory=lambda: array('i'), repr=False)
+    _head: int = field(default=0, repr=False)
+    
+    HISTORY_COMPACT_AT = 64  # Expired entries tolerated before compacting
+    
+    @property
+    def gold_history(self) -> List[Tuple[int, int]]:
+        """Live history as [(time, gold_diff), ...], oldest first."""
+        return list(zip(self._times[self._head:], self._diffs[self._head:]))
+    
+    def record_gold(self, game_time: int, gold_diff: int, window: int = 120):
+        """Append a history point and expire entries older than `window` seconds."""
+        self._times.append(game_time)
+        self._diffs.append(gold_diff)
+        
+        self._head = bisect.bisect_right(self._times, game_time - window, lo=self._head)
+        if self._head > self.HISTORY_COMPACT_AT:
+            del self._times[:self._head]
+            del self._diffs[:self._head]
+            self._head = 0
     
     def update_velocity(self):
         """Calculate gold velocity from history (last 60 seconds)."""
-        if len(self.gold_history) < 2:
+        if len(self._times) - self._head < 2:
             self.networth_velocity = 0.0
             return
         
         # Get gold diff from 60 seconds ago (or oldest if less)
-        now = self.game_time
-        target_time = now - 60
-        
-        old_gold = self.gold_history[0][1]
-        for t, g in self.gold_history:
-            if t <= target_time:
-                old_gold = g
-            else:
-                break
+        target_time = self.game_time - 60
+        idx = bisect.bisect_right(self._times, target_time, lo=self._head) - 1
+        old_gold = self._diffs[max(idx, self._head)]
         
         self.networth_velocity = (self.gold_diff - old_gold) / 60.0  # per second
 
 
-@dataclass
+@dataclass(slots=True)
 class SeriesContext:
     """Bo3/Bo5 series state."""
     series_type: str = "bo1"  # bo1, bo3, bo5
@@ -79,7 +106,7 @@ class SeriesContext:
     series_score_diff: int = 0  # radiant_wins - dire_wins
 
 
-@dataclass
+@dataclass(slots=True)
 class MatchState:
     """Complete state for a single match."""
     match_id: Optional[str] = None
@@ -102,7 +129,9 @@ class StateManager:
     """
     Singleton state manager for the Lite Monolith architecture.
     
-    Thread-safe access to shared state between API and Worker.
+    Shares state between API and Worker on one event loop. Updates contain
+    no awaits, so they run atomically without a lock; only start_match,
+    which swaps the current match, is serialized.
     """
     _instance: Optional["StateManager"] = None
     _lock: asyncio.Lock
@@ -113,12 +142,20 @@ class StateManager:
             cls._instance._lock = asyncio.Lock()
             cls._instance._current_match: Optional[MatchState] = None
             cls._instance._match_history: Dict[str, MatchState] = {}
+            cls._instance._payload_version = 0
+            cls._instance._frame_version = -1
+            cls._instance._frame = b""
         return cls._instance
     
     @property
     def current_match(self) -> Optional[MatchState]:
         return self._current_match
     
+    @property
+    def payload_version(self) -> int:
+        """Incremented on every state change; lets broadcasters reuse encoded payloads."""
+        return self._payload_version
+    
     async def start_match(self, match_id: str) -> MatchState:
         """Initialize state for a new match."""
         async with self._lock:
@@ -128,117 +165,157 @@ class StateManager:
             
             self._current_match = MatchState(match_id=match_id, is_live=True)
             self._current_match.game.match_id = match_id
+            self._payload_version += 1
             return self._current_match
     
     async def update_game_state(self, gsi_data: Dict[str, Any]) -> Optional[MatchState]:
         """Update the live game state from GSI data."""
-        async with self._lock:
-            if not self._current_match:
-                return None
-            
-            game = self._current_match.game
-            map_data = gsi_data.get("map", {})
-            
-            game.game_time = map_data.get("clock_time", 0)
-            
-            # Extract gold/xp if available (depends on GSI structure)
-            # Standard GSI from player POV vs spectator varies
-            if "player" in gsi_data:
-                # Single player GSI - limited data
-                pass
-            
-            # Try to get team totals if available
-            game.radiant_gold = map_data.get("radiant_gold", game.radiant_gold)
-            game.dire_gold = map_data.get("dire_gold", game.dire_gold)
-            game.radiant_xp = map_data.get("radiant_xp", game.radiant_xp)
-            game.dire_xp = map_data.get("dire_xp", game.dire_xp)
-            
-            game.gold_diff = game.radiant_gold - game.dire_gold
-            game.xp_diff = game.radiant_xp - game.dire_xp
-            
-            # Update velocity history
-            game.gold_history.append((game.game_time, game.gold_diff))
-            # Keep only last 2 minutes of history
-            cutoff = game.game_time - 120
-            game.gold_history = [(t, g) for t, g in game.gold_history if t > cutoff]
-            game.update_velocity()
-            
-            self._current_match.last_gsi_update = datetime.utcnow()
-            return self._current_match
+        if not self._current_match:
+            return None
+        
+        game = self._current_match.game
+        map_data = gsi_data.get("map", {})
+        
+        game.game_time = map_data.get("clock_time", 0)
+        
+        # Extract gold/xp if available (depends on GSI structure)
+        # Standard GSI from player POV vs spectator varies
+        if "player" in gsi_data:
+            # Single player GSI - limited data
+            pass
+        
+        # Try to get team totals if available
+        game.radiant_gold = map_data.get("radiant_gold", game.radiant_gold)
+        game.dire_gold = map_data.get("dire_gold", game.dire_gold)
+        game.radiant_xp = map_data.get("radiant_xp", game.radiant_xp)
+        game.dire_xp = map_data.get("dire_xp", game.dire_xp)
+        
+        game.gold_diff = game.radiant_gold - game.dire_gold
+        game.xp_diff = game.radiant_xp - game.dire_xp
+        
+        # Update velocity history (keeps only the last 2 minutes)
+        game.record_gold(game.game_time, game.gold_diff)
+        game.update_velocity()
+        
+        self._current_match.last_gsi_update = datetime.utcnow()
+        self._payload_version += 1
+        return self._current_match
     
     async def update_market_odds(self, odds: MarketOdds):
         """Update market odds from PandaScore."""
-        async with self._lock:
-            if self._current_match:
-                self._current_match.market = odds
+        if self._current_match:
+            self._current_match.market = odds
+            self._payload_version += 1
     
     async def update_draft_context(self, draft: DraftContext):
         """Update draft context from Stratz."""
-        async with self._lock:
-            if self._current_match:
-                self._current_match.draft = draft
+        if self._current_match:
+            self._current_match.draft = draft
+            self._payload_version += 1
     
     async def update_prediction(self, win_prob: float):
         """Update model prediction and calculate mispricing."""
-        async with self._lock:
-            if self._current_match:
-                self._current_match.model_win_probability = win_prob
-                market_prob = self._current_match.market.implied_radiant_prob
-                self._current_match.mispricing_index = win_prob - market_prob
+        if self._current_match:
+            self._current_match.model_win_probability = win_prob
+            market_prob = self._current_match.market.implied_radiant_prob
+            self._current_match.mispricing_index = win_prob - market_prob
+            self._payload_version += 1
     
     async def get_broadcast_payload(self) -> Dict[str, Any]:
         """Get the current state as a JSON-serializable dict for WebSocket broadcast."""
-        async with self._lock:
-            if not self._current_match:
-                return {"status": "no_match"}
-            
-            m = self._current_match
-            return {
-                "type": "update",
-                "match_id": m.match_id,
-                "is_verified": m.is_verified,
-                "game_time": m.game.game_time,
-                "gold_diff": m.game.gold_diff,
-                "xp_diff": m.game.xp_diff,
-                "networth_velocity": m.game.networth_velocity,
-                "model_win_probability": m.model_win_probability,
-                "market_implied_probability": m.market.implied_radiant_prob,
-                "market_odds_radiant": m.market.radiant_odds,
-                "mispricing_index": m.mispricing_index,
-                "draft_radiant_score": m.draft.radiant_draft_score,
-                "series_score_diff": m.series.series_score_diff,
-                "is_mock_odds": m.market.is_mock,
-            }
+        if not self._current_match:
+            return {"status": "no_match"}
+        
+        m = self._current_match
+        return {
+            "type": "update",
+            "match_id": m.match_id,
+            "is_verified": m.is_verified,
+            "game_time": m.game.game_time,
+            "gold_diff": m.game.gold_diff,
+            "xp_diff": m.game.xp_diff,
+            "networth_velocity": m.game.networth_velocity,
+            "model_win_probability": m.model_win_probability,
+            "market_implied_probability": m.market.implied_radiant_prob,
+            "market_odds_radiant": m.market.radiant_odds,
+            "mispricing_index": m.mispricing_index,
+            "draft_radiant_score": m.draft.radiant_draft_score,
+            "series_score_diff": m.series.series_score_diff,
+            "is_mock_odds": m.market.is_mock,
+        }
+    
+    def get_binary_frame(self) -> bytes:
+        """
+        Get the broadcast payload packed as a BROADCAST_FRAME.
+        
+        The packed bytes are cached until the payload version changes.
+        """
+        if self._frame_version == self._payload_version:
+            return self._frame
+        
+        m = self._current_match
+        if not m:
+            frame = b""
+        else:
+            match_id = m.match_id
+            frame = BROADCAST_FRAME.pack(
+                int(match_id) if match_id and match_id.isdigit() else -1,
+                m.game.game_time,
+                m.game.gold_diff,
+                m.game.xp_diff,
+                m.game.networth_velocity,
+                m.model_win_probability,
+                m.market.implied_radiant_prob,
+                m.market.radiant_odds,
+                m.mispricing_index,
+                m.draft.radiant_draft_score,
+                m.series.series_score_diff,
+                m.is_verified,
+                m.market.is_mock,
+            )
+        
+        self._frame = frame
+        self._frame_version = self._payload_version
+        return frame
 
 
 # Global singleton instance
 state_manager = StateManager()
 
 
-class MockMarketGenerator:
-    """Generates fake market odds for development."""
+def _make_mock_odds_generator():
+    """Build the mock odds function with its hot names bound as locals."""
+    _rand = random.random
+    _max = max
+    _min = min
+    _utcnow = datetime.utcnow
+    half_margin = 0.05 / 2  # 5% bookmaker margin, split across both sides
     
-    @staticmethod
     def generate(game_time: int, gold_diff: int) -> MarketOdds:
         """Generate mock odds that loosely track the game state."""
-        # Base probability from gold diff (simplified)
-        base_prob = 0.5 + (gold_diff / 50000)  # ±50k gold = edges
-        base_prob = max(0.2, min(0.8, base_prob))  # Clamp
+        # Base probability from gold diff (simplified), ±50k gold = edges
+        base_prob = _max(0.2, _min(0.8, 0.5 + gold_diff / 50000))
         
-        # Add some noise to simulate market inefficiency
-        noise = random.uniform(-0.05, 0.05)
-        implied_prob = base_prob + noise
-        implied_prob = max(0.1, min(0.9, implied_prob))
+        # Add some noise (±0.05) to simulate market inefficiency
+        implied_prob = _max(0.1, _min(0.9, base_prob + (_rand() - 0.5) * 0.1))
         
-        # Convert to decimal odds (with margin)
-        margin = 0.05  # 5% bookmaker margin
-        radiant_odds = 1 / (implied_prob + margin / 2)
-        dire_odds = 1 / ((1 - implied_prob) + margin / 2)
+        # Convert to decimal odds (with margin); values are positive, so
+        # int(x * 100 + 0.5) / 100 rounds to 2 places
+        radiant_odds = 1.0 / (implied_prob + half_margin)
+        dire_odds = 1.0 / ((1.0 - implied_prob) + half_margin)
         
         return MarketOdds(
-            radiant_odds=round(radiant_odds, 2),
-            dire_odds=round(dire_odds, 2),
-            implied_radiant_prob=round(implied_prob, 4),
-            last_updated=datetime.utcnow(),
+            radiant_odds=int(radiant_odds * 100 + 0.5) / 100,
+            dire_odds=int(dire_odds * 100 + 0.5) / 100,
+            implied_radiant_prob=int(implied_prob * 10000 + 0.5) / 10000,
+            last_updated=_utcnow(),
             is_mock=True
         )
+    
+    return generate
+
+
+class MockMarketGenerator:
+    """Generates fake market odds for development."""
+    
+    generate = staticmethod(_make_mock_odds_generator())
@@ -1,26 +1,72 @@
-from typing import List
+import asyncio
+from typing import Optional, Set, Union
+import orjson
 from fastapi import WebSocket
 from loguru import logger
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
+        # Subset of active_connections that receive packed state frames
+        self.binary_connections: Set[WebSocket] = set()
+        # Encoded state payload, reused until the state version changes
+        self._last_broadcast_version: Optional[int] = None
+        self._last_payload: str = ""
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, binary: bool = False):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
+        if binary:
+            self.binary_connections.add(websocket)
         logger.info(f"Client connected. Total: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        # May already have been pruned by a failed broadcast
+        self.active_connections.discard(websocket)
+        self.binary_connections.discard(websocket)
         logger.info(f"Client disconnected. Total: {len(self.active_connections)}")
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to client: {e}")
-                # We might want to remove dead connections here, but disconnect() usually handles it
-                
+        if not self.active_connections:
+            return
+
+        # Encode once, then write to every client concurrently
+        await self._send_all(orjson.dumps(message).decode())
+
+    async def broadcast_state(self, state):
+        """
+        Broadcast the StateManager payload, re-encoding only when it changed.
+        
+        Heartbeat broadcasts with no state change reuse the last encoded text.
+        Binary clients get the packed frame from state.get_binary_frame().
+        """
+        if not self.active_connections:
+            return
+
+        json_connections = self.active_connections - self.binary_connections
+        if json_connections:
+            version = state.payload_version
+            if version != self._last_broadcast_version:
+                self._last_payload = orjson.dumps(await state.get_broadcast_payload()).decode()
+                self._last_broadcast_version = version
+            await self._send_all(self._last_payload, json_connections)
+
+        if self.binary_connections:
+            await self._send_all(state.get_binary_frame(), self.binary_connections)
+
+    async def _send_all(self, payload: Union[str, bytes], connections: Optional[Set[WebSocket]] = None):
+        """Send an encoded payload to clients (default: all), pruning dead sockets."""
+        # Snapshot so connects/disconnects during the sends are safe
+        connections = tuple(self.active_connections if connections is None else connections)
+        if isinstance(payload, bytes):
+            sends = (connection.send_bytes(payload) for connection in connections)
+        else:
+            sends = (connection.send_text(payload) for connection in connections)
+        results = await asyncio.gather(*sends, return_exceptions=True)
+
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error broadcasting to client: {result}")
+                self.disconnect(connection)
+
 manager = ConnectionManager()
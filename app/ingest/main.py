@@ -4,6 +4,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
 from app.core.config import settings
+from app.core.rate_tracker import tracker, RATE_LIMIT_SCRIPT
+from app.core.redis import RedisClient
 from app.core.websockets import manager
 from app.api.matches import router as matches_router
 
@@ -31,20 +33,33 @@ app.add_middleware(
 async def startup():
     logger.info("Chronosphere API started")
     
+    # Preload the shared rate limit script so the first API call skips SCRIPT LOAD
+    await RedisClient.load_script(RATE_LIMIT_SCRIPT)
+    
     # Start background tasks
     from app.worker.retrain import auto_retrainer
     asyncio.create_task(auto_retrainer.start_loop())
+    asyncio.create_task(tracker.snapshot_loop())
 
 @app.on_event("shutdown")
 async def shutdown():
     logger.info("Chronosphere API shutting down")
+    tracker.flush()
+
+WS_PING_INTERVAL = 30  # seconds of client silence before sending a ping
+WS_PING_MESSAGE = '{"type":"ping"}'
 
 @app.websocket("/ws/live")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    # ?format=binary opts in to packed state frames (see BROADCAST_FRAME)
+    await manager.connect(websocket, binary=websocket.query_params.get("format") == "binary")
     try:
         while True:
-            await websocket.receive_text()
+            try:
+                await asyncio.wait_for(websocket.receive_text(), timeout=WS_PING_INTERVAL)
+            except asyncio.TimeoutError:
+                # Probe idle clients; a half-open connection fails the send
+                await websocket.send_text(WS_PING_MESSAGE)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
@@ -9,7 +9,7 @@ class RingBuffer:
         Assuming 10 ticks/sec, 30 ticks = 3 seconds of history.
         """
         self.buffer = deque(maxlen=max_len)
-        self.last_game_time = -1
+        self.last_sig: Optional[int] = None
 
     def add_tick(self, tick: Dict[str, Any]) -> bool:
         """
@@ -18,15 +18,23 @@ class RingBuffer:
         """
         try:
             map_data = tick.get('map', {})
-            game_time = map_data.get('clock_time', -1)
             
-            # Deduplication: If tick.game_time == last_tick.game_time, discard
-            # In a real scenario, we might check order_id if available, but clock_time is a good proxy for now.
-            if game_time == self.last_game_time:
+            # Deduplication: discard ticks whose clock and team totals match the
+            # last tick (GSI re-emits identical snapshots within a game-second).
+            # Hashing the int tuple gives a 64-bit signature with no allocation of
+            # intermediate strings.
+            sig = hash((
+                map_data.get('clock_time', -1),
+                map_data.get('radiant_gold', 0),
+                map_data.get('dire_gold', 0),
+                map_data.get('radiant_xp', 0),
+                map_data.get('dire_xp', 0),
+            ))
+            if sig == self.last_sig:
                 return False
             
             self.buffer.append(tick)
-            self.last_game_time = game_time
+            self.last_sig = sig
             return True
         except Exception as e:
             logger.error(f"Error adding tick to buffer: {e}")
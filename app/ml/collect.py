@@ -8,16 +8,27 @@ Implements:
 - API quota tracking
 """
 import asyncio
+import hashlib
+from collections import OrderedDict
 import httpx
-import json
-from datetime import datetime
+import os
+import random
+import numpy as np
+import orjson
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
 from app.core.config import settings
-from app.core.rate_tracker import tracker
+from app.core.rate_tracker import TokenBucket, tracker
 from app.services.stratz import stratz_client
 
+# Fractions of a minute for each second: 0/60, 1/60, ..., 59/60
+_SECOND_FRACTIONS = np.arange(60) / 60.0
+
+# Carry networth benchmarks: expected gold at or before each game time
+_BENCH_TIMES = np.array([600, 1200, 1800, 2400, 3000, 3600])
+_BENCH_GOLD = np.array([4000, 10000, 18000, 28000, 38000, 50000])
+
 
 class OpenDotaCollector:
     """Collects training data from OpenDota API."""
@@ -26,32 +37,67 @@ class OpenDotaCollector:
     DATA_DIR = Path("data")
     RAW_DIR = DATA_DIR / "raw"
     PROCESSED_DIR = DATA_DIR / "processed"
+    MAX_CONCURRENT_MATCHES = 20  # Matches fetched/processed at once
+    # Each concurrent match has at most 2 OpenDota requests in flight (both
+    # team histories), so the pool cap stays above peak demand and requests
+    # never queue on the pool; keep that many connections warm between pages
+    MAX_CONNECTIONS = 64
+    MAX_KEEPALIVE_CONNECTIONS = 2 * MAX_CONCURRENT_MATCHES
+    SAVE_EVERY = 10  # Matches between periodic saves
+    TEAM_STATS_CACHE_SIZE = 512  # Teams kept in team_stats_cache
+    REQUESTS_PER_MINUTE = 60  # Free tier
+    MAX_RETRIES = 4  # Retries on 429/5xx and timeouts, with exponential backoff
+    CONNECT_RETRIES = 3  # Immediate retries of failed connection attempts
+    # Endpoints whose responses never change, cached raw under RAW_DIR
+    IMMUTABLE_PREFIXES = ("/matches/",)
     
     def __init__(self):
         self.api_key = settings.OPENDOTA_API_KEY
         self._request_count = 0
-        self._last_request_time: Optional[datetime] = None
+        self._limiter = TokenBucket(self.REQUESTS_PER_MINUTE, 60.0)
+        self._saved_rows = 0  # Rows written to the training file this run
+        # Shared across requests so connections (and TLS sessions) are reused
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sem = asyncio.Semaphore(self.MAX_CONCURRENT_MATCHES)
         
         # Create data directories
         self.RAW_DIR.mkdir(parents=True, exist_ok=True)
         self.PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
         
-        self.team_stats_cache: Dict[int, Dict[str, float]] = {}  # team_id -> {pace, aggression}
+        # team_id -> task resolving to {pace, aggression, winrate}, least recently used first
+        self.team_stats_cache: "OrderedDict[int, asyncio.Task]" = OrderedDict()
 
     async def get_team_stats(self, team_id: int) -> Dict[str, float]:
-        """Get or fetch team playstyle stats."""
+        """
+        Get or fetch team playstyle stats.
+        
+        Concurrent callers for the same team share one in-flight fetch.
+        """
         if not team_id:
-            return {"pace": 0.5, "aggression": 0.0}
-            
-        if team_id in self.team_stats_cache:
-            return self.team_stats_cache[team_id]
-            
-        # Fetch history
+            return {"pace": 0.5, "aggression": 0.0, "winrate": 0.5}
+        
+        task = self.team_stats_cache.get(team_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_team_stats(team_id))
+            self.team_stats_cache[team_id] = task
+            if len(self.team_stats_cache) > self.TEAM_STATS_CACHE_SIZE:
+                self.team_stats_cache.popitem(last=False)
+        else:
+            self.team_stats_cache.move_to_end(team_id)
+        
+        try:
+            # Shielded so one cancelled caller doesn't cancel the shared fetch
+            return await asyncio.shield(task)
+        except Exception:
+            if self.team_stats_cache.get(team_id) is task:
+                del self.team_stats_cache[team_id]
+            raise
+    
+    async def _fetch_team_stats(self, team_id: int) -> Dict[str, float]:
+        """Compute team playstyle stats from recent match history."""
         history = await self.fetch_team_history(team_id, limit=20)
         if not history:
-            stats = {"pace": 0.5, "aggression": 0.0, "winrate": 0.5}
-            self.team_stats_cache[team_id] = stats
-            return stats
+            return {"pace": 0.5, "aggression": 0.0, "winrate": 0.5}
             
         # Calculate metrics
         durations = [m.get('duration', 0) for m in history]
@@ -81,49 +127,110 @@ class OpenDotaCollector:
         # Let's stick to Pace for "High Quality" without partial data.
         aggression = 0.0 
         
-        stats = {"pace": pace, "aggression": aggression, "winrate": winrate}
-        self.team_stats_cache[team_id] = stats
-        return stats
+        return {"pace": pace, "aggression": aggression, "winrate": winrate}
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.BASE_URL,
+                timeout=30.0,
+                # Transport-level retries cover failed connects; see _make_request for the rest
+                transport=httpx.AsyncHTTPTransport(
+                    retries=self.CONNECT_RETRIES,
+                    limits=httpx.Limits(
+                        max_connections=self.MAX_CONNECTIONS,
+                        max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+                    ),
+                ),
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Close the pooled HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def _raw_cache_path(self, endpoint: str, params: Optional[Dict]) -> Optional[Path]:
+        """On-disk cache path for an immutable endpoint, or None if it shouldn't be cached."""
+        if params or not endpoint.startswith(self.IMMUTABLE_PREFIXES):
+            return None
+        shard = hashlib.md5(endpoint.encode()).hexdigest()[:2]
+        return self.RAW_DIR / shard / f"{endpoint.strip('/').replace('/', '_')}.json"
+    
+    @staticmethod
+    def _write_raw(path: Path, content: bytes):
+        """Write a raw response atomically so readers never see a partial file."""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(content)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache {path.name}: {e}")
+    
+    @staticmethod
+    def _retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+        """Seconds to wait before retrying: Retry-After if given, else jittered exponential backoff."""
+        try:
+            return min(60.0, float(response.headers["Retry-After"]))
+        except (AttributeError, KeyError, ValueError):
+            return min(60.0, 2 ** attempt + random.uniform(0, 1))
     
     async def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
-        """Make a rate-limited request to OpenDota."""
-        # Check quota before making request
-        if not tracker.can_call("opendota"):
+        """
+        Make a rate-limited request to OpenDota, retrying 429/5xx with backoff.
+        
+        Immutable endpoints (finished matches) are served from the RAW_DIR
+        cache when present, so re-runs don't spend quota on them again.
+        """
+        cache_path = self._raw_cache_path(endpoint, params)
+        if cache_path and cache_path.exists():
+            try:
+                return orjson.loads(cache_path.read_bytes())
+            except (OSError, orjson.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable cache {cache_path.name}: {e}")
+        
+        params = dict(params or {})
+        if self.api_key:
+            params["api_key"] = self.api_key
+        
+        # Check quota and record the call in one step; retries of a
+        # rejected (429/5xx) attempt don't count again
+        allowed, _ = await tracker.check_and_consume("opendota")
+        if not allowed:
             logger.error("OpenDota quota exceeded - aborting request")
             return None
         
-        # Rate limiting: 60 requests per minute for free tier
-        if self._last_request_time:
-            elapsed = (datetime.utcnow() - self._last_request_time).total_seconds()
-            if elapsed < 1.0:  # At least 1 second between requests
-                await asyncio.sleep(1.0 - elapsed)
-        
         try:
-            params = params or {}
-            if self.api_key:
-                params["api_key"] = self.api_key
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.BASE_URL}{endpoint}",
-                    params=params,
-                    timeout=30.0
-                )
-                
-                self._last_request_time = datetime.utcnow()
+            for attempt in range(self.MAX_RETRIES + 1):
+                # Rate limiting: shared per-minute budget across concurrent requests
+                await self._limiter.acquire()
+                try:
+                    response = await self._get_client().get(endpoint, params=params)
+                except httpx.TimeoutException as e:
+                    if attempt == self.MAX_RETRIES:
+                        raise
+                    delay = self._retry_delay(None, attempt)
+                    logger.warning(f"OpenDota request timed out ({e!r}), retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+                    continue
                 self._request_count += 1
                 
-                # Record successful request to tracker
-                tracker.record_call("opendota")
-                
-                if response.status_code == 429:
-                    # Rate limited - back off
-                    logger.warning("Rate limited by OpenDota, sleeping 10s...")
-                    await asyncio.sleep(10)
-                    return await self._make_request(endpoint, params)
+                retryable = response.status_code == 429 or response.status_code >= 500
+                if retryable and attempt < self.MAX_RETRIES:
+                    delay = self._retry_delay(response, attempt)
+                    logger.warning(f"OpenDota returned {response.status_code}, retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+                    continue
                 
                 response.raise_for_status()
-                return response.json()
+                data = response.json()
+                # Unparsed matches gain advantage data later, so only cache parsed ones
+                if cache_path and isinstance(data, dict) and data.get("radiant_gold_adv"):
+                    self._write_raw(cache_path, response.content)
+                return data
                 
         except Exception as e:
             logger.error(f"OpenDota request failed: {e}")
@@ -152,43 +259,52 @@ class OpenDotaCollector:
             return []
         return matches[:limit]
     
-    def interpolate_minute_data(self, minute_data: List[int]) -> List[int]:
+    def interpolate_minute_data(self, minute_data: List[int]) -> np.ndarray:
         """
         Linear interpolate minute-data to second-data.
         
         Input: [0, 100, 300] (values at minutes 0, 1, 2)
         Output: [0, 1, 2, ..., 99, 100, 101, ..., 299, 300] (values per second)
         """
-        if len(minute_data) < 2:
-            return minute_data * 60 if minute_data else []
+        values = np.asarray(minute_data, dtype=np.int64)
+        if len(values) < 2:
+            return np.repeat(values, 60)
         
-        interpolated = []
-        for i in range(len(minute_data) - 1):
-            start_val = minute_data[i]
-            end_val = minute_data[i + 1]
-            
-            # Interpolate 60 seconds between each minute
-            for sec in range(60):
-                t = sec / 60.0
-                val = int(start_val + (end_val - start_val) * t)
-                interpolated.append(val)
+        # One row of 60 seconds per minute; same arithmetic as start + (end - start) * t
+        start = values[:-1, None]
+        step = np.diff(values)[:, None]
+        interpolated = (start + step * _SECOND_FRACTIONS).astype(np.int64)  # truncates like int()
         
         # Add the final value
-        interpolated.append(minute_data[-1])
+        return np.append(interpolated.ravel(), values[-1])
+    
+    def interpolate_at(self, minute_data: List[int], secs: np.ndarray) -> np.ndarray:
+        """
+        Values of interpolate_minute_data(minute_data) at the given seconds.
         
-        return interpolated
+        Seconds past the end of the series hold its last value. Only the
+        requested points are computed, not the full per-second series.
+        """
+        values = np.asarray(minute_data, dtype=np.int64)
+        if len(values) < 2:
+            return np.repeat(values, 60)[np.minimum(secs, 59)] if len(values) else np.zeros(len(secs), dtype=np.int64)
+        
+        last = (len(values) - 1) * 60
+        clamped = np.minimum(secs, last)
+        minute, sec = np.divmod(clamped, 60)
+        minute = np.minimum(minute, len(values) - 2)  # The final second is patched below
+        start = values[minute]
+        out = (start + (values[minute + 1] - start) * _SECOND_FRACTIONS[sec]).astype(np.int64)
+        out[clamped == last] = values[-1]
+        return out
     
-    def calculate_velocity_series(self, gold_adv: List[int], window: int = 60) -> List[float]:
+    def calculate_velocity_series(self, gold_adv: List[int], window: int = 60) -> np.ndarray:
         """Calculate gold velocity (change per second) for each point."""
-        if len(gold_adv) < window:
-            return [0.0] * len(gold_adv)
-        
-        velocities = [0.0] * window  # First 'window' seconds have no velocity
+        arr = np.asarray(gold_adv, dtype=np.float64)
+        velocities = np.zeros(len(arr))  # First 'window' seconds have no velocity
         
-        for i in range(window, len(gold_adv)):
-            diff = gold_adv[i] - gold_adv[i - window]
-            velocity = diff / window  # Per second
-            velocities.append(velocity)
+        if len(arr) > window:
+            velocities[window:] = (arr[window:] - arr[:-window]) / window  # Per second
         
         return velocities
     
@@ -207,48 +323,101 @@ class OpenDotaCollector:
             logger.error("No matches found")
             return []
         
-        training_rows = []
+        training_rows, processed = await self._collect_matches(pro_matches, save, with_team_stats=True)
+        
+        logger.info(f"Collected {len(training_rows)} training rows from {processed} matches")
+        return training_rows
+    
+    async def _collect_matches(
+        self,
+        matches: List[Dict],
+        save: bool,
+        with_team_stats: bool = False
+    ) -> Tuple[List[Dict], int]:
+        """
+        Fetch and process matches concurrently (bounded by MAX_CONCURRENT_MATCHES).
+        
+        Rows keep the order of `matches`. When saving, checkpoints append the
+        finished prefix of matches to the training file, so each row is
+        written once. Returns (training_rows, matches processed).
+        """
+        # Rows per match; [] once a match is done without rows, None while pending
+        results: List[Optional[List[Dict]]] = [None] * len(matches)
         processed = 0
+        saved = 0  # Matches already appended to the training file
         
-        for match in pro_matches:
-            match_id = match.get("match_id")
-            if not match_id:
-                continue
-            
-            logger.info(f"Processing match {match_id} ({processed + 1}/{len(pro_matches)})")
-            
-            details = await self.fetch_match_details(match_id)
-            if not details:
-                continue
-            
+        def save_finished_prefix():
+            nonlocal saved
+            rows = []
+            while saved < len(results) and results[saved] is not None:
+                rows.extend(results[saved])
+                saved += 1
+            self._append_training_data(rows)
+        
+        async def process_one(i: int, match_id: int):
             try:
-                # We convert match_id to str as stratz_client expects
-                draft_ctx = await stratz_client.get_draft_context(str(match_id))
-            except Exception as e:
-                logger.warning(f"Failed to fetch Stratz context for {match_id}: {e}")
-            
-            # Fetch Team Stats
-            radiant_stats = await self.get_team_stats(details.get("radiant_team_id"))
-            dire_stats = await self.get_team_stats(details.get("dire_team_id"))
-
-            rows = self._process_match_enhanced(
-                details, 
-                draft_context=draft_ctx,
-                radiant_stats=radiant_stats,
-                dire_stats=dire_stats
-            )
-            training_rows.extend(rows)
-            processed += 1
-            
-            # Save periodically
-            if save and processed % 10 == 0:
-                self._save_training_data(training_rows)
+                await collect_one(i, match_id)
+            finally:
+                if results[i] is None:
+                    results[i] = []
+        
+        async def collect_one(i: int, match_id: int):
+            nonlocal processed
+            async with self._sem:
+                logger.info(f"Processing match {match_id} ({i + 1}/{len(matches)})")
+                
+                details = await self.fetch_match_details(match_id)
+                if not details:
+                    return
+                
+                # Facet-Aware Draft Context via Stratz and Team Stats are
+                # independent, so fetch them together
+                lookups = [stratz_client.get_draft_context(str(match_id))]  # Stratz expects str ids
+                if with_team_stats:
+                    lookups.append(self.get_team_stats(details.get("radiant_team_id")))
+                    lookups.append(self.get_team_stats(details.get("dire_team_id")))
+                draft_ctx, *team_stats = await asyncio.gather(*lookups, return_exceptions=True)
+                
+                if isinstance(draft_ctx, Exception):
+                    logger.warning(f"Failed to fetch Stratz context for {match_id}: {draft_ctx}")
+                    draft_ctx = None
+                
+                # None falls back to neutral team stats in _process_match_enhanced
+                radiant_stats = dire_stats = None
+                if with_team_stats:
+                    radiant_stats, dire_stats = (
+                        None if isinstance(stats, Exception) else stats for stats in team_stats
+                    )
+                
+                results[i] = self._process_match_enhanced(
+                    details,
+                    draft_context=draft_ctx,
+                    radiant_stats=radiant_stats,
+                    dire_stats=dire_stats
+                )
+                processed += 1
+                
+                # Save periodically
+                if save and processed % self.SAVE_EVERY == 0:
+                    save_finished_prefix()
         
         if save:
-            self._save_training_data(training_rows)
+            self._start_training_data()
+        
+        for i, m in enumerate(matches):
+            if not m.get("match_id"):
+                results[i] = []
+        outcomes = await asyncio.gather(
+            *(process_one(i, m["match_id"]) for i, m in enumerate(matches) if m.get("match_id")),
+            return_exceptions=True,
+        )
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                logger.error(f"Match processing failed: {outcome}")
         
-        logger.info(f"Collected {len(training_rows)} training rows from {processed} matches")
-        return training_rows
+        if save:
+            save_finished_prefix()
+        return [row for rows in results for row in rows], processed
     
     async def collect_matches_in_range(
         self, 
@@ -289,9 +458,17 @@ class OpenDotaCollector:
             if not batch:
                 break
             
-            # Filter by date range
+            # Filter by date range, tracking the oldest time and lowest id in the same pass
+            # (stopping early at the limit is fine: the loop ends right after)
+            oldest_in_batch = min_id_in_batch = float("inf")
             for match in batch:
                 match_time = match.get("start_time", 0)
+                match_id = match.get("match_id", 0)
+                if match_time < oldest_in_batch:
+                    oldest_in_batch = match_time
+                if match_id < min_id_in_batch:
+                    min_id_in_batch = match_id
+                
                 if since_ts <= match_time <= until_ts:
                     all_matches.append(match)
                 
@@ -299,44 +476,17 @@ class OpenDotaCollector:
                     break
             
             # Check if we've gone past our date range
-            oldest_in_batch = min(m.get("start_time", 0) for m in batch)
             if oldest_in_batch < since_ts:
                 break
             
-            last_match_id = min(m.get("match_id", 0) for m in batch)
+            last_match_id = min_id_in_batch
             
             logger.info(f"Fetched batch, total matches in range: {len(all_matches)}")
         
         logger.info(f"Found {len(all_matches)} matches in date range")
         
         # Process matches into training data
-        training_rows = []
-        for i, match in enumerate(all_matches):
-            match_id = match.get("match_id")
-            if not match_id:
-                continue
-            
-            logger.info(f"Processing match {match_id} ({i + 1}/{len(all_matches)})")
-            
-            details = await self.fetch_match_details(match_id)
-            if not details:
-                continue
-            
-            # Fetch Facet-Aware Draft Context via Stratz
-            draft_ctx = None
-            try:
-                draft_ctx = await stratz_client.get_draft_context(str(match_id))
-            except Exception:
-                pass
-
-            rows = self._process_match_enhanced(details, draft_context=draft_ctx)
-            training_rows.extend(rows)
-            
-            if save and (i + 1) % 10 == 0:
-                self._save_training_data(training_rows)
-        
-        if save:
-            self._save_training_data(training_rows)
+        training_rows, _ = await self._collect_matches(all_matches, save)
         
         logger.info(f"Collected {len(training_rows)} training rows from {len(all_matches)} matches")
         return training_rows
@@ -376,15 +526,14 @@ class OpenDotaCollector:
         # Extract per-player gold time series (if available)
         players = match_data.get("players", [])
         
-        # Pre-process player gold arrays
-        player_gold_ts = []
-        for p in players:
-            g_t = p.get('gold_t', [])
-            if g_t:
-                player_gold_ts.append({
-                    'is_radiant': p.get("isRadiant", p.get("player_slot", 128) < 128),
-                    'gold_t': self.interpolate_minute_data(g_t)
-                })
+        # Player gold arrays (per-minute; sampled at row times below)
+        player_gold_ts = [
+            {
+                'is_radiant': p.get("isRadiant", p.get("player_slot", 128) < 128),
+                'gold_t': p['gold_t'],
+            }
+            for p in players if p.get('gold_t')
+        ]
 
         # Total team kills (final) - Used for linear estimation
         total_radiant_kills = sum(p.get("kills", 0) for p in players if p.get("isRadiant", p.get("player_slot", 128) < 128))
@@ -392,93 +541,89 @@ class OpenDotaCollector:
         
         # Interpolate Advantages
         gold_series = self.interpolate_minute_data(radiant_gold_adv)
-        xp_series = self.interpolate_minute_data(radiant_xp_adv) if radiant_xp_adv else [0] * len(gold_series)
+        xp_series = self.interpolate_minute_data(radiant_xp_adv)
         velocity_series = self.calculate_velocity_series(gold_series)
         
-        # Benchmarks for Carry Efficiency
-        benchmarks = {600: 4000, 1200: 10000, 1800: 18000, 2400: 28000, 3000: 38000, 3600: 50000}
+        # Row times: every 30 seconds, up to the match duration
+        secs = np.arange(0, len(gold_series), 30)
+        secs = secs[secs < duration]
+        
+        # Per-row columns for every row at once
+        gold = gold_series[secs]
+        xp = np.zeros(len(secs), dtype=np.int64)  # 0 where the xp series runs short
+        has_xp = secs < len(xp_series)
+        xp[has_xp] = xp_series[secs[has_xp]]
+        velocity = velocity_series[secs]
+        
+        # 1. Kills Estimate (secs is empty unless duration > 0)
+        kills = ((total_radiant_kills - total_dire_kills) * (secs / duration)).astype(np.int64)
+        
+        # Player networths at each row time, shape (players, rows); shorter
+        # series hold their last value
+        radiant_mask = np.array([p['is_radiant'] for p in player_gold_ts], dtype=bool)
+        nw_mat = np.array(
+            [self.interpolate_at(p['gold_t'], secs) for p in player_gold_ts],
+            dtype=np.int64,
+        ).reshape(len(player_gold_ts), len(secs))
+        
+        # 2. Gini Coefficient of the leading side's networths
+        gini = np.where(
+            gold >= 0,
+            self._gini_columns(nw_mat[radiant_mask]),
+            self._gini_columns(nw_mat[~radiant_mask]),
+        )
         
-        # Generate a training row every 30 seconds
-        for sec in range(0, len(gold_series), 30):
-            if sec >= duration:
-                break
-            
-            # 1. Kills Estimate
-            time_ratio = sec / duration if duration > 0 else 0
-            kills_diff_est = int((total_radiant_kills - total_dire_kills) * time_ratio)
-            
-            # 2. Gini Coefficient (Real Calculation)
-            gini = 0.0
-            if player_gold_ts:
-                current_nws = []
-                is_radiant_leading = gold_series[sec] >= 0
-                for p_data in player_gold_ts:
-                    if p_data['is_radiant'] == is_radiant_leading:
-                        t_idx = min(sec, len(p_data['gold_t']) - 1)
-                        current_nws.append(p_data['gold_t'][t_idx])
-                
-                if current_nws and sum(current_nws) > 0:
-                    current_nws.sort()
-                    n = len(current_nws)
-                    cumulative = 0
-                    gini_sum = 0
-                    for i, nw in enumerate(current_nws):
-                        cumulative += nw
-                        gini_sum += (2 * (i + 1) - n - 1) * nw
-                    gini = gini_sum / (n * sum(current_nws))
-            
-            # 3. Carry Efficiency
-            efficiency = 1.0
-            if player_gold_ts:
-                # Identify carry (highest NW on Radiant)
-                radiant_nws = [
-                    p['gold_t'][min(sec, len(p['gold_t']) - 1)] 
-                    for p in player_gold_ts if p['is_radiant']
-                ]
-                if radiant_nws:
-                    max_nw = max(radiant_nws)
-                    # Find benchmark
-                    bench = benchmarks[3600]
-                    for t_mark, gold_mark in sorted(benchmarks.items()):
-                        if sec <= t_mark:
-                            bench = gold_mark
-                            break
-                    efficiency = max(0.5, min(2.0, max_nw / bench)) if bench > 0 else 1.0
-
-            row = {
-                "match_id": match_data.get("match_id"),
+        # 3. Carry Efficiency: highest Radiant networth vs the first benchmark at or after each row
+        if radiant_mask.any():
+            bench = _BENCH_GOLD[np.minimum(np.searchsorted(_BENCH_TIMES, secs), len(_BENCH_GOLD) - 1)]
+            efficiency = np.clip(nw_mat[radiant_mask].max(axis=0) / bench, 0.5, 2.0)
+        else:
+            efficiency = np.ones(len(secs))
+        
+        # Generate a training row every 30 seconds (tolist() keeps values plain for JSON)
+        match_id = match_data.get("match_id")
+        label = 1 if radiant_win else 0
+        rows = [
+            {
+                "match_id": match_id,
                 "start_time": start_time,
                 "game_time": sec,
-                "game_time_normalized": min(1.0, sec / 3600.0),
-                "gold_diff": gold_series[sec],
-                "gold_diff_normalized": max(-1.0, min(1.0, gold_series[sec] / 50000.0)),
-                "xp_diff": xp_series[sec] if sec < len(xp_series) else 0,
-                "xp_diff_normalized": max(-1.0, min(1.0, (xp_series[sec] if sec < len(xp_series) else 0) / 30000.0)),
-                "networth_velocity": velocity_series[sec] if sec < len(velocity_series) else 0.0,
-                "networth_gini": gini,
+                "game_time_normalized": sec_n,
+                "gold_diff": gold_diff,
+                "gold_diff_normalized": gold_n,
+                "xp_diff": xp_diff,
+                "xp_diff_normalized": xp_n,
+                "networth_velocity": vel,
+                "networth_gini": gini_val,
                 "buyback_power_ratio": 0.0,
                 "draft_score_diff": draft_score_diff,
                 "late_game_score_diff": late_game_score_diff, 
                 "series_score_diff": 0.0,
-                "carry_efficiency_index": efficiency,
-                "radiant_pace_score": r_stats["pace"],
-                "dire_pace_score": d_stats["pace"],
-                "radiant_aggression_score": r_stats["aggression"],
-                "dire_aggression_score": d_stats["aggression"],
-                "radiant_recent_winrate": r_stats["winrate"],
-                "dire_recent_winrate": d_stats["winrate"],
-                "kills_diff": kills_diff_est,
+                "carry_efficiency_index": eff,
                 "radiant_pace_score": r_stats["pace"],
                 "dire_pace_score": d_stats["pace"],
                 "radiant_aggression_score": r_stats["aggression"],
                 "dire_aggression_score": d_stats["aggression"],
                 "radiant_recent_winrate": r_stats["winrate"],
                 "dire_recent_winrate": d_stats["winrate"],
-                "kills_diff": kills_diff_est,
-                "kills_diff_normalized": max(-1.0, min(1.0, kills_diff_est / 30.0)),
-                "radiant_win": 1 if radiant_win else 0,
+                "kills_diff": kills_diff,
+                "kills_diff_normalized": kills_n,
+                "radiant_win": label,
             }
-            rows.append(row)
+            for sec, sec_n, gold_diff, gold_n, xp_diff, xp_n, vel, gini_val, eff, kills_diff, kills_n in zip(
+                secs.tolist(),
+                np.minimum(secs / 3600.0, 1.0).tolist(),
+                gold.tolist(),
+                np.clip(gold / 50000.0, -1.0, 1.0).tolist(),
+                xp.tolist(),
+                np.clip(xp / 30000.0, -1.0, 1.0).tolist(),
+                velocity.tolist(),
+                gini.tolist(),
+                efficiency.tolist(),
+                kills.tolist(),
+                np.clip(kills / 30.0, -1.0, 1.0).tolist(),
+            )
+        ]
         
         return rows
     
@@ -486,13 +631,38 @@ class OpenDotaCollector:
         """Wrapper for enhanced process (legacy support)."""
         return self._process_match_enhanced(match_data)
     
-    def _save_training_data(self, rows: List[Dict]):
-        """Save training data to file."""
-        filepath = self.PROCESSED_DIR / "training_data.jsonl"
-        with open(filepath, "w") as f:
-            for row in rows:
-                f.write(json.dumps(row) + "\n")
-        logger.info(f"Saved {len(rows)} rows to {filepath}")
+    @staticmethod
+    def _gini_columns(networths: np.ndarray) -> np.ndarray:
+        """Gini coefficient of each column of a (players, times) networth matrix (0 if empty)."""
+        n = len(networths)
+        totals = networths.sum(axis=0)
+        if n == 0:
+            return np.zeros(networths.shape[1])
+        
+        weights = 2 * np.arange(1, n + 1) - n - 1
+        gini_sums = weights @ np.sort(networths, axis=0)
+        return np.where(totals > 0, gini_sums / np.where(totals > 0, n * totals, 1), 0.0)
+    
+    @property
+    def training_data_path(self) -> Path:
+        return self.PROCESSED_DIR / "training_data.jsonl"
+    
+    def _start_training_data(self):
+        """Truncate the training file at the start of a collection run."""
+        self.training_data_path.write_bytes(b"")
+        self._saved_rows = 0
+    
+    def _append_training_data(self, rows: List[Dict]):
+        """Append newly collected rows to the training file."""
+        if not rows:
+            return
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+        # Encode the whole batch first so it lands in a single write
+        data = b"".join([orjson.dumps(row, option=option) for row in rows])
+        with open(self.training_data_path, "ab") as f:
+            f.write(data)
+        self._saved_rows += len(rows)
+        logger.info(f"Saved {self._saved_rows} rows to {self.training_data_path}")
 
 
 # CLI entry point
@@ -512,17 +682,23 @@ async def main():
     
     collector = OpenDotaCollector()
     
-    if args.mode == "production" or args.since:
-        # Production mode: use date range with enhanced features
-        since = args.since or "2025-09-04"  # Default to TI 2025
-        await collector.collect_matches_in_range(
-            since_date=since,
-            until_date=args.until,
-            limit=args.limit
-        )
-    else:
-        # Quick mode: just grab recent pro matches
-        await collector.collect_training_data(num_matches=args.limit)
+    try:
+        if args.mode == "production" or args.since:
+            # Production mode: use date range with enhanced features
+            since = args.since or "2025-09-04"  # Default to TI 2025
+            await collector.collect_matches_in_range(
+                since_date=since,
+                until_date=args.until,
+                limit=args.limit
+            )
+        else:
+            # Quick mode: just grab recent pro matches
+            await collector.collect_training_data(num_matches=args.limit)
+    finally:
+        await collector.aclose()
+    
+    # Persist quota usage for the next session
+    tracker.flush()
 
 
 if __name__ == "__main__":
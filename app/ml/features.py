@@ -8,10 +8,12 @@ Implements the "Contextual Alpha" feature set:
 
 Feature order must match training data exactly.
 """
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional, Tuple
 from loguru import logger
 import math
+import numpy as np
 
 
 # Feature names in expected order (must match training)
@@ -149,173 +151,132 @@ MODEL_FEATURE_NAMES = [
 ]
 
 
-@dataclass
-class FeatureVector:
-    """Typed feature vector - 55 total features for optimal XGBoost performance."""
+# Buffer positions for each feature, and the gather index for the model subset
+_FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+MODEL_FEATURE_INDEX = np.array([_FEATURE_INDEX[name] for name in MODEL_FEATURE_NAMES], dtype=np.intp)
+_MODEL_COLUMN = {name: i for i, name in enumerate(MODEL_FEATURE_NAMES)}
+
+# Neutral priors for features that don't default to 0.0
+_NONZERO_DEFAULTS = {
+    # Category A: Live Game State
+    "carry_efficiency_index": 1.0,
+    "fight_win_rate": 0.5,
+    # Category B: Hero & Draft
+    "radiant_avg_hero_winrate": 0.5,
+    "dire_avg_hero_winrate": 0.5,
+    # Category C: Player
+    "radiant_avg_mmr": 6000.0,
+    "dire_avg_mmr": 6000.0,
+    "radiant_core_performance": 0.5,
+    "dire_core_performance": 0.5,
+    "radiant_support_performance": 0.5,
+    "dire_support_performance": 0.5,
+    # Category D: Team History
+    "radiant_recent_winrate": 0.5,
+    "dire_recent_winrate": 0.5,
+    "radiant_tournament_winrate": 0.5,
+    "dire_tournament_winrate": 0.5,
+    "h2h_radiant_winrate": 0.5,
+    "radiant_consistency": 0.5,
+    "dire_consistency": 0.5,
+    # Category E: Match Context
+    "game_number_in_series": 1.0,
+    "tournament_tier": 3.0,
+    "match_importance": 0.5,
+}
+FEATURE_DEFAULTS = np.array([_NONZERO_DEFAULTS.get(name, 0.0) for name in FEATURE_NAMES], dtype=np.float64)
+_MODEL_DEFAULTS = FEATURE_DEFAULTS[MODEL_FEATURE_INDEX]
+
+
+class _FeatureView(Mapping):
+    """Read-only name -> value view over a FeatureVector buffer; values are read on access."""
+    __slots__ = ('_buf',)
     
-    # ═══════════════════════════════════════════════════════════════
-    # CATEGORY A: LIVE GAME STATE (16 features)
-    # ═══════════════════════════════════════════════════════════════
-    game_time: float = 0.0
-    game_time_normalized: float = 0.0
-    gold_diff: float = 0.0
-    gold_diff_normalized: float = 0.0
-    xp_diff: float = 0.0
-    xp_diff_normalized: float = 0.0
-    networth_velocity: float = 0.0
-    networth_gini: float = 0.0
-    kill_diff: float = 0.0
-    kill_diff_normalized: float = 0.0
-    tower_advantage: float = 0.0
-    buyback_power_ratio: float = 0.0
-    momentum_score: float = 0.0
-    lead_fragility: float = 0.0
-    carry_efficiency_index: float = 1.0
-    fight_win_rate: float = 0.5
+    def __init__(self, buf: np.ndarray):
+        self._buf = buf
     
-    # ═══════════════════════════════════════════════════════════════
-    # CATEGORY B: HERO & DRAFT FEATURES (14 features)
-    # ═══════════════════════════════════════════════════════════════
-    radiant_avg_hero_winrate: float = 0.5
-    dire_avg_hero_winrate: float = 0.5
-    draft_score_diff: float = 0.0
-    late_game_score_diff: float = 0.0
-    radiant_counter_score: float = 0.0
-    dire_counter_score: float = 0.0
-    radiant_synergy_score: float = 0.0
-    dire_synergy_score: float = 0.0
-    radiant_teamfight_score: float = 0.0
-    dire_teamfight_score: float = 0.0
-    radiant_lane_advantage: float = 0.0
-    dire_lane_advantage: float = 0.0
-    radiant_early_game_score: float = 0.0
-    dire_early_game_score: float = 0.0
+    def __getitem__(self, name: str) -> float:
+        return float(self._buf[_FEATURE_INDEX[name]])
     
-    # ═══════════════════════════════════════════════════════════════
-    # CATEGORY C: PLAYER FEATURES (8 features)
-    # ═══════════════════════════════════════════════════════════════
-    radiant_avg_mmr: float = 6000.0
-    dire_avg_mmr: float = 6000.0
-    mmr_diff_normalized: float = 0.0
-    radiant_core_performance: float = 0.5
-    dire_core_performance: float = 0.5
-    radiant_support_performance: float = 0.5
-    dire_support_performance: float = 0.5
-    hero_experience_diff: float = 0.0
+    def __iter__(self) -> Iterator[str]:
+        return iter(FEATURE_NAMES)
     
-    # ═══════════════════════════════════════════════════════════════
-    # CATEGORY D: TEAM HISTORY (10 features)
-    # ═══════════════════════════════════════════════════════════════
-    radiant_recent_winrate: float = 0.5
-    dire_recent_winrate: float = 0.5
-    radiant_tournament_winrate: float = 0.5
-    dire_tournament_winrate: float = 0.5
-    h2h_radiant_winrate: float = 0.5
-    h2h_games_played: float = 0.0
-    radiant_consistency: float = 0.5
-    dire_consistency: float = 0.5
-    radiant_momentum_trend: float = 0.0
-    dire_momentum_trend: float = 0.0
+    def __len__(self) -> int:
+        return len(FEATURE_NAMES)
     
-    # ═══════════════════════════════════════════════════════════════
-    # CATEGORY E: MATCH CONTEXT (7 features)
-    # ═══════════════════════════════════════════════════════════════
-    series_score_diff: float = 0.0
-    game_number_in_series: float = 1.0
-    is_elimination_game: float = 0.0
-    radiant_first_pick: float = 0.0
-    pick_phase_advantage: float = 0.0
-    tournament_tier: float = 3.0
-    match_importance: float = 0.5
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class FeatureVector:
+    """
+    Typed feature vector - 55 total features for optimal XGBoost performance.
+    
+    Values live in one preallocated buffer in FEATURE_NAMES order; each feature
+    name is a property reading/writing its slot, so to_list/to_model_list are a
+    single copy/gather instead of 55 attribute loads.
+    """
+    __slots__ = ('_buf',)
+    
+    def __init__(self, **features: float):
+        self._buf = FEATURE_DEFAULTS.copy()
+        for name, value in features.items():
+            if name not in _FEATURE_INDEX:
+                raise TypeError(f"Unknown feature: {name}")
+            self._buf[_FEATURE_INDEX[name]] = value
     
     def to_list(self) -> List[float]:
         """Convert to list with ALL 55 features (for training)."""
-        return [
-            # Category A: Live Game State (16)
-            self.game_time,
-            self.game_time_normalized,
-            self.gold_diff,
-            self.gold_diff_normalized,
-            self.xp_diff,
-            self.xp_diff_normalized,
-            self.networth_velocity,
-            self.networth_gini,
-            self.kill_diff,
-            self.kill_diff_normalized,
-            self.tower_advantage,
-            self.buyback_power_ratio,
-            self.momentum_score,
-            self.lead_fragility,
-            self.carry_efficiency_index,
-            self.fight_win_rate,
-            # Category B: Hero & Draft (14)
-            self.radiant_avg_hero_winrate,
-            self.dire_avg_hero_winrate,
-            self.draft_score_diff,
-            self.late_game_score_diff,
-            self.radiant_counter_score,
-            self.dire_counter_score,
-            self.radiant_synergy_score,
-            self.dire_synergy_score,
-            self.radiant_teamfight_score,
-            self.dire_teamfight_score,
-            self.radiant_lane_advantage,
-            self.dire_lane_advantage,
-            self.radiant_early_game_score,
-            self.dire_early_game_score,
-            # Category C: Player (8)
-            self.radiant_avg_mmr,
-            self.dire_avg_mmr,
-            self.mmr_diff_normalized,
-            self.radiant_core_performance,
-            self.dire_core_performance,
-            self.radiant_support_performance,
-            self.dire_support_performance,
-            self.hero_experience_diff,
-            # Category D: Team History (10)
-            self.radiant_recent_winrate,
-            self.dire_recent_winrate,
-            self.radiant_tournament_winrate,
-            self.dire_tournament_winrate,
-            self.h2h_radiant_winrate,
-            self.h2h_games_played,
-            self.radiant_consistency,
-            self.dire_consistency,
-            self.radiant_momentum_trend,
-            self.dire_momentum_trend,
-            # Category E: Match Context (7)
-            self.series_score_diff,
-            self.game_number_in_series,
-            self.is_elimination_game,
-            self.radiant_first_pick,
-            self.pick_phase_advantage,
-            self.tournament_tier,
-            self.match_importance,
-        ]
+        return self._buf.tolist()
     
     def to_model_list(self) -> List[float]:
         """Convert to list with only the 13 features the current model expects."""
-        return [
-            self.game_time,
-            self.game_time_normalized,
-            self.gold_diff,
-            self.gold_diff_normalized,
-            self.xp_diff,
-            self.xp_diff_normalized,
-            self.networth_velocity,
-            self.networth_gini,
-            self.buyback_power_ratio,
-            self.draft_score_diff,
-            self.late_game_score_diff,
-            self.series_score_diff,
-            self.carry_efficiency_index,
-        ]
-    
-    def to_dict(self) -> Dict[str, float]:
-        """Convert to dict for logging/debugging."""
-        return {name: val for name, val in zip(FEATURE_NAMES, self.to_list())}
+        return self._buf[MODEL_FEATURE_INDEX].tolist()
+    
+    def to_model_array(self) -> np.ndarray:
+        """Model features as a contiguous float32 row, ready for XGBoost without a cast."""
+        return self._buf[MODEL_FEATURE_INDEX].astype(np.float32)
+    
+    def to_dict(self) -> Mapping[str, float]:
+        """
+        Name -> value mapping for logging/debugging.
+        
+        Returns a lazy view over the buffer; call dict() on it for a snapshot.
+        """
+        return _FeatureView(self._buf)
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FeatureVector):
+            return NotImplemented
+        return bool(np.array_equal(self._buf, other._buf))
+    
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={val!r}" for name, val in zip(FEATURE_NAMES, self.to_list()))
+        return f"FeatureVector({values})"
+
+
+def _feature_property(index: int) -> property:
+    def fget(self) -> float:
+        return float(self._buf[index])
+    
+    def fset(self, value: float) -> None:
+        self._buf[index] = value
+    
+    return property(fget, fset)
 
 
+for _name, _index in _FEATURE_INDEX.items():
+    setattr(FeatureVector, _name, _feature_property(_index))
+
+
+
+class PlayerEconomy(NamedTuple):
+    """Per-team player economy parsed from a tick's allplayers in one pass."""
+    radiant_nw: np.ndarray  # Networths of Radiant players
+    dire_nw: np.ndarray
+    radiant_gold: int  # Summed gold (+ reliable/unreliable) per team
+    dire_gold: int
+
 
 class FeatureExtractor:
     """
@@ -336,9 +297,18 @@ class FeatureExtractor:
         3000: 38000,  # 50 min
         3600: 50000,  # 60 min
     }
+    _BENCHMARK_TIMES, _BENCHMARK_GOLD = zip(*sorted(CARRY_GOLD_BENCHMARKS.items()))
+    # Array copies for the batch path's searchsorted
+    _BENCH_T = np.array(_BENCHMARK_TIMES, dtype=np.float64)
+    _BENCH_G = np.array(_BENCHMARK_GOLD, dtype=np.float64)
+    
+    # Gini rank weights (2i - n - 1) for a full five-player team
+    _GINI_W = 2 * np.arange(1, 6, dtype=np.float64) - 5 - 1
     
     def __init__(self):
         self._last_networths: Dict[str, List[int]] = {}  # player_id -> [networth history]
+        # Scratch vector reused by extract(), reset to defaults each call
+        self._fv = FeatureVector()
     
     def extract(self, tick: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> List[float]:
         """
@@ -352,15 +322,19 @@ class FeatureExtractor:
             List of 13 floats for the current model (to_model_list)
         """
         try:
-            fv = FeatureVector()
+            fv = self._fv
+            np.copyto(fv._buf, FEATURE_DEFAULTS)
             
             # Time features (2)
             map_data = tick.get('map', {})
             fv.game_time = float(map_data.get('clock_time', 0))
             fv.game_time_normalized = min(1.0, fv.game_time / self.MAX_GAME_TIME)
             
+            # One pass over allplayers feeds every player-derived feature
+            players = self._parse_players(tick)
+            
             # Economy features (6)
-            fv.gold_diff = self._extract_gold_diff(tick, map_data)
+            fv.gold_diff = self._extract_gold_diff(players, map_data)
             fv.gold_diff_normalized = max(-1.0, min(1.0, fv.gold_diff / self.MAX_GOLD_DIFF))
             
             fv.xp_diff = self._extract_xp_diff(tick, map_data)
@@ -371,7 +345,7 @@ class FeatureExtractor:
                 fv.networth_velocity = context['networth_velocity']
             
             # Gini coefficient
-            fv.networth_gini = self._calculate_gini(tick)
+            fv.networth_gini = self._calculate_gini(players)
             
             # Combat features (4)
             radiant_score = float(map_data.get('radiant_score', 0))
@@ -398,18 +372,14 @@ class FeatureExtractor:
                 fv.series_score_diff = context.get('series_score_diff', 0.0)
             
             # Efficiency (1)
-            fv.carry_efficiency_index = self._calculate_carry_efficiency(tick, fv.game_time)
+            fv.carry_efficiency_index = self._calculate_carry_efficiency(players, fv.game_time)
             
             # Momentum & Stability (2)
             fv.momentum_score = self._calculate_momentum(tick, context)
             fv.lead_fragility = self._calculate_lead_fragility(fv.gold_diff, fv.game_time, context)
             
-            # Team playstyle (6) - from context if available
+            # Team history - from context if available
             if context:
-                fv.radiant_pace_score = context.get('radiant_pace_score', 0.5)
-                fv.dire_pace_score = context.get('dire_pace_score', 0.5)
-                fv.radiant_aggression_score = context.get('radiant_aggression_score', 0.0)
-                fv.dire_aggression_score = context.get('dire_aggression_score', 0.0)
                 fv.radiant_recent_winrate = context.get('radiant_recent_winrate', 0.5)
                 fv.dire_recent_winrate = context.get('dire_recent_winrate', 0.5)
             
@@ -417,7 +387,119 @@ class FeatureExtractor:
             
         except Exception as e:
             logger.error(f"Error extracting features: {e}")
-            return FeatureVector().to_model_list()  # Return safe defaults
+            return _MODEL_DEFAULTS.tolist()  # Return safe defaults
+    
+    def extract_batch(
+        self,
+        ticks: List[Dict[str, Any]],
+        contexts: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> np.ndarray:
+        """
+        Extract features for several ticks at once.
+        
+        Ticks are parsed into column arrays in a single Python pass; the
+        normalization, Gini and carry-efficiency math then runs as NumPy
+        expressions over the whole batch. Rows match extract() - a tick
+        that fails to parse gets the default row.
+        
+        Args:
+            ticks: GSI data dictionaries
+            contexts: Optional per-tick contexts (same length as ticks)
+        
+        Returns:
+            (N, 13) float32 array ready for ModelWrapper.predict_batch
+        """
+        n = len(ticks)
+        if not n:
+            return np.empty((0, len(MODEL_FEATURE_NAMES)), dtype=np.float32)
+        if contexts is None:
+            contexts = [None] * n
+        
+        col = _MODEL_COLUMN
+        out = np.tile(_MODEL_DEFAULTS, (n, 1))
+        valid = np.ones(n, dtype=bool)
+        game_time = np.zeros(n)
+        map_gold = np.zeros((n, 2))
+        player_gold = np.zeros((n, 2))
+        xp_diff = np.zeros(n)
+        radiant_nw: List[List[float]] = []
+        dire_nw: List[List[float]] = []
+        
+        # Parse pass: one walk per tick, scalars straight into columns
+        for i, (tick, context) in enumerate(zip(ticks, contexts)):
+            try:
+                map_data = tick.get('map', {})
+                game_time[i] = float(map_data.get('clock_time', 0))
+                r_nw, d_nw, r_gold, d_gold = self._split_players(tick)
+                map_gold[i] = map_data.get('radiant_gold', 0), map_data.get('dire_gold', 0)
+                player_gold[i] = r_gold, d_gold
+                xp_diff[i] = self._extract_xp_diff(tick, map_data)
+                out[i, col['buyback_power_ratio']] = self._estimate_buyback_ratio(tick)
+                if context:
+                    if 'networth_velocity' in context:
+                        out[i, col['networth_velocity']] = context['networth_velocity']
+                    out[i, col['draft_score_diff']] = context.get('draft_score_diff', 0.0)
+                    out[i, col['late_game_score_diff']] = context.get('late_game_score_diff', 0.0)
+                    out[i, col['series_score_diff']] = context.get('series_score_diff', 0.0)
+            except Exception as e:
+                logger.error(f"Error extracting features: {e}")
+                valid[i] = False
+                r_nw, d_nw = [], []
+            radiant_nw.append(r_nw)
+            dire_nw.append(d_nw)
+        
+        # Economy: map gold wins, allplayers sums are the fallback
+        gold_diff = np.where(
+            map_gold.any(axis=1),
+            map_gold[:, 0] - map_gold[:, 1],
+            player_gold[:, 0] - player_gold[:, 1],
+        )
+        
+        # Networth tables, NaN-padded to a common width
+        width = max(1, max(map(len, radiant_nw)), max(map(len, dire_nw)))
+        radiant = self._pad_networths(radiant_nw, width)
+        dire = self._pad_networths(dire_nw, width)
+        
+        # Gini of the leading team; NaN padding sorts to the end of each row
+        radiant_leads = np.nansum(radiant, axis=1) > np.nansum(dire, axis=1)
+        lead = np.sort(np.where(radiant_leads[:, None], radiant, dire), axis=1)
+        counts = np.count_nonzero(~np.isnan(lead), axis=1)
+        totals = np.nansum(lead, axis=1)
+        weights = 2 * np.arange(1, width + 1) - counts[:, None] - 1
+        gini_sum = np.nansum(weights * lead, axis=1)
+        gini = np.divide(gini_sum, counts * totals, out=np.zeros(n), where=(counts >= 2) & (totals != 0))
+        
+        # Carry efficiency: best Radiant networth vs the time benchmark
+        bench_idx = np.searchsorted(self._BENCH_T, game_time, side='left')
+        benchmark = self._BENCH_G[np.minimum(bench_idx, self._BENCH_G.size - 1)]
+        has_radiant = ~np.isnan(radiant[:, 0])
+        carry_nw = np.fmax.reduce(radiant, axis=1)  # NaN-skipping max
+        carry = np.where(has_radiant, np.clip(carry_nw / benchmark, 0.5, 2.0), 1.0)
+        
+        out[:, col['game_time']] = game_time
+        out[:, col['gold_diff']] = gold_diff
+        out[:, col['xp_diff']] = xp_diff
+        
+        # Normalize and clamp straight into the output columns (no temporaries)
+        time_norm = out[:, col['game_time_normalized']]
+        np.minimum(np.divide(game_time, self.MAX_GAME_TIME, out=time_norm), 1.0, out=time_norm)
+        gold_norm = out[:, col['gold_diff_normalized']]
+        np.clip(np.divide(gold_diff, self.MAX_GOLD_DIFF, out=gold_norm), -1.0, 1.0, out=gold_norm)
+        xp_norm = out[:, col['xp_diff_normalized']]
+        np.clip(np.divide(xp_diff, self.MAX_XP_DIFF, out=xp_norm), -1.0, 1.0, out=xp_norm)
+        np.clip(gini, 0.0, 1.0, out=out[:, col['networth_gini']])
+        out[:, col['carry_efficiency_index']] = carry
+        out[~valid] = _MODEL_DEFAULTS
+        
+        return out.astype(np.float32)
+    
+    @staticmethod
+    def _pad_networths(rows: List[List[float]], width: int) -> np.ndarray:
+        """Stack ragged per-tick networth lists into an (N, width) NaN-padded table."""
+        table = np.full((len(rows), width), np.nan)
+        for i, row in enumerate(rows):
+            table[i, :len(row)] = row
+        return table
     
     def _calculate_momentum(self, tick: Dict[str, Any], context: Optional[Dict[str, Any]]) -> float:
         """Calculate momentum score (-1 to 1, positive = Radiant momentum)."""
@@ -470,7 +552,42 @@ class FeatureExtractor:
         fragility = size_fragility * 0.5 + time_factor * 0.3 + late_game_factor * 0.2
         return max(0.0, min(1.0, fragility))
     
-    def _extract_gold_diff(self, tick: Dict[str, Any], map_data: Dict[str, Any]) -> float:
+    def _parse_players(self, tick: Dict[str, Any]) -> PlayerEconomy:
+        """Split allplayers into per-team networth arrays and gold totals in one pass."""
+        radiant_nw, dire_nw, radiant_gold, dire_gold = self._split_players(tick)
+        return PlayerEconomy(
+            np.array(radiant_nw, dtype=np.float64),
+            np.array(dire_nw, dtype=np.float64),
+            radiant_gold,
+            dire_gold,
+        )
+    
+    def _split_players(self, tick: Dict[str, Any]) -> Tuple[List[float], List[float], int, int]:
+        """Walk allplayers once: (radiant networths, dire networths, radiant gold, dire gold)."""
+        radiant_nw = []
+        dire_nw = []
+        radiant_gold = 0
+        dire_gold = 0
+        
+        all_players = tick.get('allplayers', tick.get('players', {}))
+        for player in (all_players or {}).values():
+            if not isinstance(player, dict):
+                continue
+            get = player.get
+            gold = get('gold', 0)
+            nw = get('net_worth', gold)
+            gold += get('gold_reliable', 0) + get('gold_unreliable', 0)
+            team = get('team_name', get('team', ''))
+            if team == 'radiant' or get('team_slot', 10) < 5:
+                radiant_nw.append(nw)
+                radiant_gold += gold
+            else:
+                dire_nw.append(nw)
+                dire_gold += gold
+        
+        return radiant_nw, dire_nw, radiant_gold, dire_gold
+    
+    def _extract_gold_diff(self, players: PlayerEconomy, map_data: Dict[str, Any]) -> float:
         """Extract gold difference (Radiant - Dire)."""
         # Try direct team gold first (spectator GSI)
         radiant_gold = map_data.get('radiant_gold', 0)
@@ -479,21 +596,9 @@ class FeatureExtractor:
         if radiant_gold or dire_gold:
             return float(radiant_gold - dire_gold)
         
-        # Try to sum from allplayers if available
-        all_players = tick.get('allplayers', tick.get('players', {}))
-        if all_players:
-            radiant_total = 0
-            dire_total = 0
-            for player_id, player in all_players.items():
-                if isinstance(player, dict):
-                    gold = player.get('gold', 0) + player.get('gold_reliable', 0) + player.get('gold_unreliable', 0)
-                    team = player.get('team_name', player.get('team', ''))
-                    if team == 'radiant' or player.get('team_slot', 10) < 5:
-                        radiant_total += gold
-                    else:
-                        dire_total += gold
-            if radiant_total or dire_total:
-                return float(radiant_total - dire_total)
+        # Fall back to the allplayers sums
+        if players.radiant_gold or players.dire_gold:
+            return float(players.radiant_gold - players.dire_gold)
         
         return 0.0
     
@@ -507,7 +612,7 @@ class FeatureExtractor:
         
         return 0.0
     
-    def _calculate_gini(self, tick: Dict[str, Any]) -> float:
+    def _calculate_gini(self, players: PlayerEconomy) -> float:
         """
         Calculate Gini coefficient of networth distribution.
         
@@ -516,49 +621,26 @@ class FeatureExtractor:
         
         We calculate for the leading team.
         """
-        all_players = tick.get('allplayers', tick.get('players', {}))
-        if not all_players:
-            return 0.0
-        
-        # Collect networths by team
-        radiant_nw = []
-        dire_nw = []
-        
-        for player_id, player in all_players.items():
-            if isinstance(player, dict):
-                nw = player.get('net_worth', player.get('gold', 0))
-                team = player.get('team_name', player.get('team', ''))
-                if team == 'radiant' or player.get('team_slot', 10) < 5:
-                    radiant_nw.append(nw)
-                else:
-                    dire_nw.append(nw)
-        
         # Use leading team's distribution
-        total_radiant = sum(radiant_nw) if radiant_nw else 0
-        total_dire = sum(dire_nw) if dire_nw else 0
-        
-        if total_radiant > total_dire:
-            networths = sorted(radiant_nw)
+        if players.radiant_nw.sum() > players.dire_nw.sum():
+            networths = np.sort(players.radiant_nw)
         else:
-            networths = sorted(dire_nw)
+            networths = np.sort(players.dire_nw)
         
-        if len(networths) < 2:
+        n = networths.size
+        if n < 2:
             return 0.0
         
-        # Calculate Gini coefficient
-        n = len(networths)
-        total = sum(networths)
+        total = networths.sum()
         if total == 0:
             return 0.0
         
-        # Standard Gini formula
-        cumulative = 0
-        gini_sum = 0
-        for i, nw in enumerate(networths):
-            cumulative += nw
-            gini_sum += (2 * (i + 1) - n - 1) * nw
-        
-        gini = gini_sum / (n * total)
+        # Standard Gini formula: sum((2i - n - 1) * x_i) / (n * sum(x)) over sorted x
+        if n == self._GINI_W.size:
+            weights = self._GINI_W
+        else:
+            weights = 2 * np.arange(1, n + 1, dtype=np.float64) - n - 1
+        gini = float(weights @ networths / (n * total))
         return max(0.0, min(1.0, gini))
     
     def _estimate_buyback_ratio(self, tick: Dict[str, Any]) -> float:
@@ -571,43 +653,28 @@ class FeatureExtractor:
         # For now, return 0 (neutral)
         return 0.0
     
-    def _calculate_carry_efficiency(self, tick: Dict[str, Any], game_time: float) -> float:
+    def _calculate_carry_efficiency(self, players: PlayerEconomy, game_time: float) -> float:
         """
         Calculate Pos1 carry efficiency vs benchmark.
         
         > 1.0 = Overperforming
         < 1.0 = Underperforming
         """
-        # Find the benchmark for current game time
-        benchmark = 0
-        for time_threshold, gold in sorted(self.CARRY_GOLD_BENCHMARKS.items()):
-            if game_time <= time_threshold:
-                benchmark = gold
-                break
+        # Find the benchmark for current game time (first threshold >= game_time)
+        idx = bisect_left(self._BENCHMARK_TIMES, game_time)
+        if idx < len(self._BENCHMARK_GOLD):
+            benchmark = self._BENCHMARK_GOLD[idx]
         else:
-            benchmark = self.CARRY_GOLD_BENCHMARKS[3600]  # Max benchmark
+            benchmark = self._BENCHMARK_GOLD[-1]  # Max benchmark
         
         if benchmark == 0:
             return 1.0
         
-        # Try to find Pos1 player networth
-        all_players = tick.get('allplayers', tick.get('players', {}))
-        if not all_players:
-            return 1.0
-        
-        # Find highest networth player on Radiant (simplified assumption)
-        radiant_nws = []
-        for player_id, player in all_players.items():
-            if isinstance(player, dict):
-                team = player.get('team_name', player.get('team', ''))
-                if team == 'radiant' or player.get('team_slot', 10) < 5:
-                    nw = player.get('net_worth', player.get('gold', 0))
-                    radiant_nws.append(nw)
-        
-        if not radiant_nws:
+        # Find highest networth player on Radiant (simplified assumption for Pos1)
+        if not players.radiant_nw.size:
             return 1.0
         
-        carry_nw = max(radiant_nws)
+        carry_nw = float(players.radiant_nw.max())
         efficiency = carry_nw / benchmark if benchmark > 0 else 1.0
         
         # Clamp to reasonable range
@@ -8,8 +8,11 @@ Features:
 - Avoid re-processing same matches
 """
 import json
+import mmap
+import re
+import orjson
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Literal, Optional, Set, Tuple
 from datetime import datetime
 from loguru import logger
 
@@ -17,7 +20,7 @@ import numpy as np
 
 try:
     import xgboost as xgb
-    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.isotonic import IsotonicRegression
     from sklearn.model_selection import train_test_split
     from sklearn.metrics import log_loss, accuracy_score, roc_auc_score
     import joblib
@@ -26,7 +29,10 @@ except ImportError as e:
     xgb = None
 
 from app.ml.versioning import version_manager, ModelMetadata
-from app.ml.train import FEATURE_COLS, TARGET_COL
+from app.ml.train import FEATURE_COLS, parse_training_arrays
+
+# "match_id": N in a raw training row (null IDs don't match)
+_MATCH_ID_RE = re.compile(rb'"match_id"\s*:\s*(\d+)')
 
 
 class IncrementalTrainer:
@@ -42,16 +48,38 @@ class IncrementalTrainer:
     DATA_DIR = Path("data/processed")
     SYNC_STATE_FILE = DATA_DIR / "sync_state.json"
     
+    # Shared by fresh training and warm-start continuation
+    XGB_PARAMS = {
+        "objective": "binary:logistic",
+        "eval_metric": "logloss",
+        "max_depth": 6,
+        "learning_rate": 0.1,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8,
+        "random_state": 42,
+        "tree_method": "hist",  # Histogram splits over max_bin buckets
+        "max_bin": 256,
+        "enable_categorical": False,  # All features are numeric float32
+        "n_jobs": -1,  # All cores
+    }
+    FRESH_ROUNDS = 100
+    CONTINUE_ROUNDS = 50  # Trees appended per warm-start run
+    # "auto" refreshes the existing trees instead of appending while the rows
+    # added since the last training run are under this fraction of the total
+    REFRESH_MAX_FRACTION = 0.1
+    
     def __init__(self):
         self.DATA_DIR.mkdir(parents=True, exist_ok=True)
         self._sync_state = self._load_sync_state()
+        # Match IDs already in the training file, valid while its (size, mtime) is unchanged
+        self._seen_match_ids: Optional[Set[int]] = None
+        self._seen_stamp: Optional[Tuple[int, int]] = None
     
     def _load_sync_state(self) -> Dict[str, Any]:
         """Load sync state (last match ID, etc.)."""
         if self.SYNC_STATE_FILE.exists():
             try:
-                with open(self.SYNC_STATE_FILE, "r") as f:
-                    return json.load(f)
+                return orjson.loads(self.SYNC_STATE_FILE.read_bytes())
             except Exception:
                 pass
         return {
@@ -77,6 +105,71 @@ class IncrementalTrainer:
         self._sync_state["total_rows"] = self._sync_state.get("total_rows", 0) + rows_added
         self._save_sync_state()
     
+    @property
+    def match_ids_path(self) -> Path:
+        """Sidecar index of the match IDs in the training file (raw uint64)."""
+        return self.DATA_DIR / "match_ids.bin"
+    
+    @staticmethod
+    def _file_stamp(path: Path) -> Tuple[int, int]:
+        stat = path.stat()
+        return stat.st_size, stat.st_mtime_ns
+    
+    def _existing_match_ids(self, filepath: Path) -> Set[int]:
+        """
+        Match IDs already in the training file.
+        
+        Served from memory while the file is unchanged since our last append,
+        else from the sidecar index. The JSONL is only rescanned when the index
+        is missing or older than the file (e.g. the collector rewrote it).
+        """
+        if not filepath.exists():
+            self.match_ids_path.unlink(missing_ok=True)
+            self._seen_match_ids, self._seen_stamp = set(), None
+            return self._seen_match_ids
+        
+        stamp = self._file_stamp(filepath)
+        if self._seen_match_ids is not None and stamp == self._seen_stamp:
+            return self._seen_match_ids
+        
+        index = self.match_ids_path
+        if index.exists() and index.stat().st_mtime_ns >= stamp[1]:
+            seen = set(np.fromfile(index, dtype=np.uint64).tolist())
+        else:
+            # Only the IDs are needed, so pull them out of the raw bytes
+            # instead of parsing every row (mmap rejects empty files)
+            seen = set()
+            if stamp[0]:
+                with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    seen = {int(m) for m in _MATCH_ID_RE.findall(mm)}
+            np.fromiter(seen, dtype=np.uint64, count=len(seen)).tofile(index)
+        
+        self._seen_match_ids, self._seen_stamp = seen, stamp
+        return seen
+    
+    def _trusted_file_max(self, filepath: Path) -> Optional[int]:
+        """
+        The file's highest match ID as recorded by our last append.
+        
+        Only trusted while the file is exactly as that append left it (stamp
+        recorded in sync state), since the collector may rewrite it.
+        """
+        max_match_id = self._sync_state.get("max_match_id")
+        stamp = self._sync_state.get("file_stamp")
+        if max_match_id is None or stamp is None or not filepath.exists():
+            return None
+        if list(self._file_stamp(filepath)) != stamp:
+            return None
+        return max_match_id
+    
+    def _all_newer_than_file(self, filepath: Path, new_rows: List[Dict]) -> bool:
+        """True if every incoming match ID is above the file's (trusted) highest one."""
+        max_match_id = self._trusted_file_max(filepath)
+        if max_match_id is None:
+            return False
+        ids = [r.get("match_id") for r in new_rows]
+        return None not in ids and min(ids) > max_match_id
+    
     def append_training_data(self, new_rows: List[Dict]) -> int:
         """
         Append new training rows to existing dataset.
@@ -85,34 +178,106 @@ class IncrementalTrainer:
         """
         filepath = self.DATA_DIR / "training_data.jsonl"
         
-        # Load existing match IDs to avoid duplicates
-        existing_match_ids = set()
-        if filepath.exists():
-            with open(filepath, "r") as f:
-                for line in f:
-                    row = json.loads(line)
-                    existing_match_ids.add(row.get("match_id"))
-        
-        # Filter new rows
-        unique_rows = [r for r in new_rows if r.get("match_id") not in existing_match_ids]
+        known_max = self._trusted_file_max(filepath)
+        existing_match_ids = None
+        if new_rows and self._all_newer_than_file(filepath, new_rows):
+            # Append-only stream caught up: nothing can be a duplicate
+            unique_rows = new_rows
+        else:
+            # Existing match IDs to avoid duplicates
+            existing_match_ids = self._existing_match_ids(filepath)
+            unique_rows = [r for r in new_rows if r.get("match_id") not in existing_match_ids]
         
         if not unique_rows:
             logger.info("No new unique rows to add")
             return 0
         
-        # Append to file
-        with open(filepath, "a") as f:
-            for row in unique_rows:
-                f.write(json.dumps(row) + "\n")
+        # Append to file in a single write
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+        data = b"".join([orjson.dumps(row, option=option) for row in unique_rows])
+        with open(filepath, "ab") as f:
+            f.write(data)
+        
+        # Extend the index after the data so it never looks older than the file
+        new_ids = {r["match_id"] for r in unique_rows if r.get("match_id") is not None}
+        id_array = np.fromiter(new_ids, dtype=np.uint64, count=len(new_ids))
+        with open(self.match_ids_path, "ab") as f:
+            f.write(id_array.tobytes())
+        new_max = int(id_array.max()) if len(id_array) else None
+        stamp = self._file_stamp(filepath)
+        if existing_match_ids is None:
+            self._seen_match_ids = None  # Not loaded; re-read from the index if needed
+        else:
+            existing_match_ids.update(new_ids)
+            self._seen_stamp = stamp
+        
+        # Only fall back to a pass over every known ID when the old max is unknown
+        if known_max is not None:
+            file_max = known_max if new_max is None else max(known_max, new_max)
+        else:
+            file_max = max(existing_match_ids, default=None)
         
         logger.info(f"Appended {len(unique_rows)} new rows (filtered {len(new_rows) - len(unique_rows)} duplicates)")
         
-        # Update last match ID
-        max_match_id = max(r.get("match_id", 0) for r in unique_rows)
+        # Update last match ID, plus the file's max ID/stamp for the fast path
+        max_match_id = 0 if new_max is None else new_max
+        self._sync_state["max_match_id"] = file_max
+        self._sync_state["file_stamp"] = list(stamp)
         self.update_sync_state(max_match_id, len(unique_rows))
         
         return len(unique_rows)
     
+    @property
+    def feature_cache_path(self) -> Path:
+        """Columnar read cache of the training file (float32 X, int8 y)."""
+        return self.DATA_DIR / "training_arrays.npz"
+    
+    def _load_feature_arrays(self, filepath: Path) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (X, y) for every row of the training file.
+        
+        The JSONL stays the append log; the parsed columns are cached next to it
+        with the file's (size, mtime) stamp. When the file has only grown since
+        (the bytes just before the cached end are unchanged), just the appended
+        lines are parsed; any other change rebuilds the cache.
+        """
+        stamp = np.array(self._file_stamp(filepath), dtype=np.int64)
+        size = int(stamp[0])
+        cache = self.feature_cache_path
+        X = y = None
+        offset = 0
+        if cache.exists():
+            with np.load(cache) as arrays:
+                if np.array_equal(arrays["stamp"], stamp):
+                    return arrays["X"], arrays["y"]
+                cached_size = int(arrays["stamp"][0])
+                if cached_size <= size and self._tail_bytes(filepath, cached_size) == arrays["tail"].tobytes():
+                    X, y, offset = arrays["X"], arrays["y"], cached_size
+        
+        # Parse exactly up to the stamped size, so the next delta starts there
+        with open(filepath, "rb") as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        X_new, y_new = parse_training_arrays(data)
+        if X is not None:
+            logger.info(f"Parsed {len(y_new)} appended rows onto {len(y)} cached")
+            X, y = np.concatenate([X, X_new]), np.concatenate([y, y_new])
+        else:
+            X, y = X_new, y_new
+        
+        tail = np.frombuffer(self._tail_bytes(filepath, size), dtype=np.uint8)
+        with open(cache, "wb") as f:
+            np.savez(f, X=X, y=y, stamp=stamp, tail=tail)
+        return X, y
+    
+    @staticmethod
+    def _tail_bytes(path: Path, end: int, n: int = 256) -> bytes:
+        """The n bytes of a file ending at offset end."""
+        start = max(0, end - n)
+        with open(path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+    
     def load_all_data(self, limit: int = 50000) -> Tuple[np.ndarray, np.ndarray]:
         """
         Load all training data.
@@ -126,20 +291,14 @@ class IncrementalTrainer:
         if not filepath.exists():
             raise FileNotFoundError(f"Training data not found: {filepath}")
         
-        rows = []
-        with open(filepath, "r") as f:
-            for line in f:
-                rows.append(json.loads(line))
+        X, y = self._load_feature_arrays(filepath)
         
         # Rolling Window Strategy: Data closer to end is newer (by file append nature)
-        if len(rows) > limit:
-            logger.info(f"Applying Rolling Window: Keeping last {limit} of {len(rows)} rows")
-            rows = rows[-limit:]
+        if len(y) > limit:
+            logger.info(f"Applying Rolling Window: Keeping last {limit} of {len(y)} rows")
+            X, y = X[-limit:], y[-limit:]
             
-        logger.info(f"Loaded {len(rows)} features for training")
-        
-        X = np.array([[row.get(col, 0.0) for col in FEATURE_COLS] for row in rows])
-        y = np.array([row.get(TARGET_COL, 0) for row in rows])
+        logger.info(f"Loaded {len(y)} features for training")
         
         return X, y
     
@@ -148,6 +307,7 @@ class IncrementalTrainer:
         patch: str = "7.39e",
         test_size: float = 0.2,
         continue_from: Optional[int] = None,
+        mode: Literal["append", "refresh", "auto"] = "append",
     ) -> Dict[str, Any]:
         """
         Train a new model version.
@@ -156,6 +316,9 @@ class IncrementalTrainer:
             patch: Current Dota patch
             test_size: Fraction for test set
             continue_from: Version to continue from (warm start)
+            mode: How to continue: "append" adds CONTINUE_ROUNDS trees,
+                  "refresh" re-fits the existing trees' leaves (and prunes)
+                  on the current data, "auto" refreshes for small drift
         
         Returns:
             Dict with version, paths, and metrics
@@ -175,36 +338,47 @@ class IncrementalTrainer:
         if continue_from and continue_from in version_manager._versions:
             # Warm start from previous model
             logger.info(f"Continuing from model v{continue_from}")
-            model = version_manager.load_model(continue_from)
+            previous = version_manager.load_model(continue_from)
+            
+            # Continue with the native API; the sklearn wrapper's n_estimators
+            # accounting doesn't survive a save/load
+            params = xgb.XGBClassifier(**self.XGB_PARAMS).get_xgb_params()
+            num_boost_round = self.CONTINUE_ROUNDS
+            if mode == "auto":
+                mode = self._choose_continue_mode()
+            if mode == "refresh":
+                # One pass per existing tree: same structure, new leaf values
+                logger.info("Refreshing existing trees instead of appending")
+                params.pop("tree_method", None)  # Ignored once updater is set
+                params.update(process_type="update", updater="refresh,prune")
+                num_boost_round = previous.get_booster().num_boosted_rounds()
             
-            # Additional boosting rounds
-            model.set_params(n_estimators=model.n_estimators + 50)
-            model.fit(
-                X_train, y_train,
-                eval_set=[(X_test, y_test)],
-                xgb_model=model.get_booster(),
-                verbose=True
+            dtrain = xgb.DMatrix(X_train, label=y_train)
+            dtest = xgb.DMatrix(X_test, label=y_test)
+            booster = xgb.train(
+                params,
+                dtrain,
+                num_boost_round=num_boost_round,
+                xgb_model=previous.get_booster(),
+                evals=[(dtest, "val")],
+                verbose_eval=True,
             )
+            
+            # Back into the sklearn wrapper for evaluation, calibration and saving
+            model = xgb.XGBClassifier(**self.XGB_PARAMS)
+            model.load_model(bytearray(booster.save_raw(raw_format="json")))
             parent_version = continue_from
         else:
             # Fresh training
             logger.info("Training fresh model")
-            model = xgb.XGBClassifier(
-                objective="binary:logistic",
-                eval_metric="logloss",
-                n_estimators=100,
-                max_depth=6,
-                learning_rate=0.1,
-                subsample=0.8,
-                colsample_bytree=0.8,
-                random_state=42,
-            )
+            model = xgb.XGBClassifier(n_estimators=self.FRESH_ROUNDS, **self.XGB_PARAMS)
             model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=True)
             parent_version = None
+            mode = None
         
         # Evaluate
         y_pred_proba = model.predict_proba(X_test)[:, 1]
-        y_pred = model.predict(X_test)
+        y_pred = (y_pred_proba > 0.5).astype(np.int64)  # What model.predict thresholds at
         
         metrics = {
             "logloss": float(log_loss(y_test, y_pred_proba)),
@@ -214,10 +388,10 @@ class IncrementalTrainer:
         
         # Isotonic calibration
         logger.info("Applying isotonic calibration...")
-        calibrated = CalibratedClassifierCV(model, method="isotonic", cv="prefit")
-        calibrated.fit(X_test, y_test)
+        # Fit straight on the scores computed above instead of re-predicting X_test
+        calibrated = IsotonicRegression(out_of_bounds="clip").fit(y_pred_proba, y_test)
         
-        y_calibrated = calibrated.predict_proba(X_test)[:, 1]
+        y_calibrated = calibrated.predict(y_pred_proba)
         metrics["calibrated_logloss"] = float(log_loss(y_test, y_calibrated))
         
         # Get version number
@@ -229,6 +403,8 @@ class IncrementalTrainer:
         
         model.save_model(model_path)
         joblib.dump(calibrated, calib_path)
+        from app.ml.model import save_isotonic
+        save_isotonic(calibrated, calib_path)
         
         # Feature importance
         importance = dict(zip(FEATURE_COLS, [float(x) for x in model.feature_importances_]))
@@ -248,6 +424,10 @@ class IncrementalTrainer:
         # Set as current
         version_manager.set_current(version)
         
+        # Baseline for the next "auto" continuation
+        self._sync_state["trained_total_rows"] = self._sync_state.get("total_rows", 0)
+        self._save_sync_state()
+        
         logger.info(f"✅ Trained model v{version}: {metrics}")
         
         return {
@@ -260,7 +440,16 @@ class IncrementalTrainer:
             "training_samples": len(X_train),
             "test_samples": len(X_test),
             "parent_version": parent_version,
+            "mode": mode,
         }
+    
+    def _choose_continue_mode(self) -> str:
+        """Refresh while few rows were added since the last training run, else append."""
+        total = self._sync_state.get("total_rows", 0)
+        trained = self._sync_state.get("trained_total_rows")
+        if trained is None or total - trained >= self.REFRESH_MAX_FRACTION * total:
+            return "append"
+        return "refresh"
 
 
 # CLI entry point
@@ -272,6 +461,10 @@ def main():
     parser.add_argument("--patch", type=str, default="7.39e", help="Dota patch version")
     parser.add_argument("--test-size", type=float, default=0.2, help="Test set fraction")
     parser.add_argument("--continue-from", type=int, help="Version to continue from")
+    parser.add_argument(
+        "--mode", choices=["append", "refresh", "auto"], default="append",
+        help="Continue by appending trees or refreshing the existing ones",
+    )
     args = parser.parse_args()
     
     trainer = IncrementalTrainer()
@@ -279,6 +472,7 @@ def main():
         patch=args.patch,
         test_size=args.test_size,
         continue_from=args.continue_from,
+        mode=args.mode,
     )
     
     print("\n=== Incremental Training Complete ===")
@@ -3,16 +3,17 @@ Model Wrapper: Loads and runs XGBoost inference with optional calibration.
 
 Implements:
 - Model loading from JSON (XGBoost native format)
-- Calibration model loading (scikit-learn joblib)
+- Calibration model loading (scikit-learn joblib, or isotonic thresholds .npz)
 - Fallback heuristic when no model is trained
 - Feature importance access
 """
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from loguru import logger
-import math
 import numpy as np
 
+from app.ml.features import MODEL_FEATURE_NAMES
+
 # Lazy imports for ML libraries
 try:
     import xgboost as xgb
@@ -33,10 +34,17 @@ class ModelWrapper:
     
     MODEL_DIR = Path("app/ml/models")
     
+    __slots__ = ("model", "calibrator", "_feature_importance", "_booster", "_buf", "_isotonic")
+    
     def __init__(self, model_path: Optional[str] = None, calibration_path: Optional[str] = None):
         self.model = None
         self.calibrator = None
         self._feature_importance: Dict[str, float] = {}
+        # Native booster plus a reused (1, F) float32 row for single predictions
+        self._booster = None
+        self._buf: Optional[np.ndarray] = None
+        # (booster, X_thresholds_, y_thresholds_) per isotonic calibrator, if unwrapped
+        self._isotonic: Optional[List[Tuple[Any, np.ndarray, np.ndarray]]] = None
         
         # Try to load latest model if no path specified
         if model_path is None:
@@ -61,16 +69,18 @@ class ModelWrapper:
         try:
             self.model = xgb.XGBClassifier()
             self.model.load_model(str(path))
+            self._booster = self.model.get_booster()
+            self._buf = np.empty((1, self._booster.num_features()), dtype=np.float32)
             
-            # Extract feature importance
+            # Extract feature importance (the model sees MODEL_FEATURE_NAMES columns)
             if hasattr(self.model, 'feature_importances_'):
-                from app.ml.features import FEATURE_NAMES
-                self._feature_importance = dict(zip(FEATURE_NAMES, self.model.feature_importances_))
+                self._feature_importance = dict(zip(MODEL_FEATURE_NAMES, self.model.feature_importances_))
             
             logger.info(f"Loaded XGBoost model from {path}")
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             self.model = None
+            self._booster = self._buf = None
     
     def load_calibrator(self, path: str | Path):
         """Load isotonic calibration model."""
@@ -82,12 +92,53 @@ class ModelWrapper:
             logger.debug(f"Calibration model not found: {path}")
             return
         
+        # Thresholds saved with this calibrator: no need to unpickle sklearn objects
+        sidecar = isotonic_path(path)
+        if (
+            self._booster is not None
+            and sidecar.exists()
+            and sidecar.stat().st_mtime_ns >= path.stat().st_mtime_ns
+        ):
+            with np.load(sidecar) as thresholds:
+                self._isotonic = [(self._booster, thresholds["X_thresholds"], thresholds["y_thresholds"])]
+            self.calibrator = None
+            logger.info(f"Loaded isotonic thresholds from {sidecar}")
+            return
+        
         try:
             self.calibrator = joblib.load(path)
+            self._isotonic = self._unwrap_isotonic(self.calibrator, self._booster)
             logger.info(f"Loaded calibration model from {path}")
         except Exception as e:
             logger.error(f"Failed to load calibrator: {e}")
             self.calibrator = None
+            self._isotonic = None
+    
+    @staticmethod
+    def _unwrap_isotonic(calibrator, booster=None) -> Optional[List[Tuple[Any, np.ndarray, np.ndarray]]]:
+        """
+        Pull the booster and isotonic step function out of each calibrated fold.
+        
+        A bare IsotonicRegression (fit on the model's scores, as the trainers
+        save it) pairs with `booster`. Returns None (use calibrator.predict_proba)
+        for anything other than that or a binary isotonic CalibratedClassifierCV
+        over XGBoost estimators.
+        """
+        if hasattr(calibrator, "X_thresholds_"):
+            return [(booster, calibrator.X_thresholds_, calibrator.y_thresholds_)]
+        
+        folds = []
+        for fold in getattr(calibrator, "calibrated_classifiers_", ()):
+            estimator = getattr(fold.estimator, "estimator", fold.estimator)  # FrozenEstimator
+            if (
+                fold.method != "isotonic"
+                or len(fold.calibrators) != 1
+                or not hasattr(estimator, "get_booster")
+            ):
+                return None
+            isotonic = fold.calibrators[0]
+            folds.append((estimator.get_booster(), isotonic.X_thresholds_, isotonic.y_thresholds_))
+        return folds or None
     
     def predict(self, features: List[float]) -> float:
         """
@@ -99,32 +150,38 @@ class ModelWrapper:
         Returns:
             Probability between 0.0 and 1.0
         """
-        # Use trained model if available
-        if self.model is not None and HAS_ML:
-            try:
-                X = np.array([features])
-                
-                if self.calibrator is not None:
-                    # Use calibrated predictions
-                    prob = self.calibrator.predict_proba(X)[0, 1]
-                else:
-                    # Use raw model predictions
-                    prob = self.model.predict_proba(X)[0, 1]
-                
-                return float(prob)
-                
-            except Exception as e:
-                logger.error(f"Prediction failed: {e}")
-                # Fall through to heuristic
+        buf = self._buf
+        if buf is not None and len(features) == buf.shape[1]:
+            buf[0] = features  # Reuse the row buffer instead of allocating one
+            return float(self.predict_batch(buf)[0])
+        return float(self.predict_batch([features])[0])
+    
+    def _model_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Model (or calibrated) probability for a float32 (N, F) matrix.
         
-        # Fallback: Heuristic based on features
-        return self._heuristic_predict(features)
+        Goes straight to Booster.inplace_predict, skipping the sklearn wrapper's
+        DMatrix construction. Isotonic calibration is applied with np.interp over
+        the fitted thresholds, averaged across folds like CalibratedClassifierCV.
+        """
+        if self._isotonic is None:
+            if self.calibrator is not None:
+                return self.calibrator.predict_proba(X)[:, 1].astype(np.float64)
+            return self._booster.inplace_predict(X).astype(np.float64)
+        
+        probs = np.zeros(len(X))
+        for booster, x_thresholds, y_thresholds in self._isotonic:
+            raw = booster.inplace_predict(X).astype(x_thresholds.dtype)
+            probs += np.interp(raw, x_thresholds, y_thresholds).astype(x_thresholds.dtype)
+        probs /= len(self._isotonic)
+        return probs
     
-    def _heuristic_predict(self, features: List[float]) -> float:
+    def _heuristic_predict(self, X: np.ndarray) -> np.ndarray:
         """
         Fallback heuristic when no trained model is available.
         
-        Uses a simple logistic function based on gold_diff and game_time.
+        Uses a simple logistic function based on gold_diff and game_time,
+        evaluated for the whole (N, F) batch at once.
         """
         # Expected feature order (see features.py):
         # 0: game_time
@@ -133,13 +190,18 @@ class ModelWrapper:
         # 3: gold_diff_normalized
         # 4: xp_diff
         # 5: xp_diff_normalized
+        # 6: networth_velocity
         # ...
         
-        game_time = features[0] if len(features) > 0 else 0
-        gold_diff = features[2] if len(features) > 2 else 0
-        gold_diff_normalized = features[3] if len(features) > 3 else 0
-        xp_diff_normalized = features[5] if len(features) > 5 else 0
-        velocity = features[6] if len(features) > 6 else 0
+        # Missing trailing features count as 0
+        X = np.asarray(X, dtype=np.float64)
+        if X.shape[1] < 7:
+            X = np.pad(X, ((0, 0), (0, 7 - X.shape[1])))
+        
+        game_time = X[:, 0]
+        gold_diff_normalized = X[:, 3]
+        xp_diff_normalized = X[:, 5]
+        velocity = X[:, 6]
         
         # Base probability from normalized gold diff
         # Using logistic function: 1 / (1 + exp(-k * x))
@@ -153,21 +215,47 @@ class ModelWrapper:
         velocity_factor = velocity / 100.0  # Normalize velocity
         combined += velocity_factor * 0.2
         
-        # Apply logistic transformation
-        base_prob = 1.0 / (1.0 + math.exp(-k * combined))
+        # Apply logistic transformation (exp overflow -> inf -> probability 0)
+        with np.errstate(over="ignore"):
+            base_prob = 1.0 / (1.0 + np.exp(-k * combined))
         
         # Time factor: Early game differences matter less
-        time_weight = min(1.0, game_time / 1200.0)  # Ramp up over 20 minutes
+        time_weight = np.minimum(1.0, game_time / 1200.0)  # Ramp up over 20 minutes
         
         # Final probability: blend with 50% base weighted by time
         prob = 0.5 + (base_prob - 0.5) * time_weight
         
         # Clamp to valid range
-        return max(0.01, min(0.99, prob))
+        return np.clip(prob, 0.01, 0.99)
     
-    def predict_batch(self, features_batch: List[List[float]]) -> List[float]:
-        """Predict for multiple feature vectors."""
-        return [self.predict(f) for f in features_batch]
+    def predict_batch(self, features_batch: List[List[float]] | np.ndarray) -> np.ndarray:
+        """
+        Predict Radiant win probability for multiple feature vectors.
+        
+        Scores the whole (N, F) matrix in a single model call. Features are
+        handed over as float32 (XGBoost's internal type), so float32 input
+        from FeatureExtractor.extract_batch is passed through without a copy.
+        
+        Returns:
+            1D array of N probabilities
+        """
+        X = np.asarray(features_batch, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) == 0:
+            return np.empty(0, dtype=np.float64)
+        
+        # Use trained model if available
+        if self.model is not None and HAS_ML:
+            try:
+                return self._model_proba(X)
+                
+            except Exception as e:
+                logger.error(f"Prediction failed: {e}")
+                # Fall through to heuristic
+        
+        # Fallback: Heuristic based on features
+        return self._heuristic_predict(X)
     
     @property
     def feature_importance(self) -> Dict[str, float]:
@@ -182,7 +270,32 @@ class ModelWrapper:
     @property
     def is_calibrated(self) -> bool:
         """Check if calibration is applied."""
-        return self.calibrator is not None
+        return self.calibrator is not None or self._isotonic is not None
+
+
+def isotonic_path(calibration_path: str | Path) -> Path:
+    """Sidecar holding the isotonic thresholds of a calibration pickle."""
+    return Path(calibration_path).with_suffix(".npz")
+
+
+def save_isotonic(calibrator, calibration_path: str | Path) -> bool:
+    """
+    Save an isotonic calibrator's thresholds next to its pickle.
+    
+    ModelWrapper then calibrates with np.interp over these against the model
+    saved alongside. Returns False (and removes any old sidecar) when the
+    calibrator is not a single-fold isotonic one.
+    """
+    path = isotonic_path(calibration_path)
+    folds = ModelWrapper._unwrap_isotonic(calibrator)
+    if folds is None or len(folds) != 1:
+        path.unlink(missing_ok=True)
+        return False
+    
+    _, x_thresholds, y_thresholds = folds[0]
+    with open(path, "wb") as f:
+        np.savez(f, X_thresholds=x_thresholds, y_thresholds=y_thresholds)
+    return True
 
 
 # Singleton for reuse in worker
@@ -7,18 +7,21 @@ Implements:
 - Isotonic calibration for probability accuracy
 - Model versioning and saving
 """
-import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
 from datetime import datetime
 from loguru import logger
 
 import numpy as np
+import orjson
+import pandas as pd
 
 # ML imports (lazy loaded to reduce startup time)
 try:
     import xgboost as xgb
-    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.isotonic import IsotonicRegression
     from sklearn.model_selection import train_test_split
     from sklearn.metrics import log_loss, accuracy_score, roc_auc_score
     import joblib
@@ -46,6 +49,48 @@ FEATURE_COLS = [
 
 TARGET_COL = "radiant_win"
 
+# Cold parses smaller than this aren't worth starting worker processes for
+PARALLEL_PARSE_MIN_BYTES = 8 << 20
+
+
+def parse_training_lines(lines) -> pd.DataFrame:
+    """DataFrame from raw JSONL lines (bytes), skipping blank ones."""
+    return pd.DataFrame([orjson.loads(line) for line in lines if line.strip()])
+
+
+def frame_to_arrays(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Gather (X, y) from a training frame; missing features/targets become 0."""
+    X = df.reindex(columns=FEATURE_COLS).fillna(0.0).to_numpy(dtype=np.float32)
+    y = df.reindex(columns=[TARGET_COL]).fillna(0).to_numpy(dtype=np.int8).ravel()
+    return X, y
+
+
+def _parse_chunk(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    return frame_to_arrays(parse_training_lines(data.splitlines()))
+
+
+def parse_training_arrays(data: bytes, workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (X, y) from a block of raw JSONL bytes.
+    
+    Large blocks are split into one byte range per worker, aligned to line
+    ends, and parsed in separate processes; the row order is preserved.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(data) < PARALLEL_PARSE_MIN_BYTES:
+        return _parse_chunk(data)
+    
+    bounds = [0]
+    for i in range(1, workers):
+        end = data.find(b"\n", max(bounds[-1], len(data) * i // workers))
+        bounds.append(len(data) if end < 0 else end + 1)
+    bounds.append(len(data))
+    chunks = [data[start:end] for start, end in zip(bounds, bounds[1:]) if end > start]
+    
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        parts = list(pool.map(_parse_chunk, chunks))
+    return np.concatenate([X for X, _ in parts]), np.concatenate([y for _, y in parts])
+
 
 class ModelTrainer:
     """Trains and calibrates XGBoost model."""
@@ -63,16 +108,10 @@ class ModelTrainer:
         if not filepath.exists():
             raise FileNotFoundError(f"Training data not found: {filepath}")
         
-        rows = []
-        with open(filepath, "r") as f:
-            for line in f:
-                rows.append(json.loads(line))
-        
-        logger.info(f"Loaded {len(rows)} training rows")
-        
         # Extract features and target
-        X = np.array([[row.get(col, 0.0) for col in FEATURE_COLS] for row in rows])
-        y = np.array([row.get(TARGET_COL, 0) for row in rows])
+        X, y = parse_training_arrays(filepath.read_bytes())
+        
+        logger.info(f"Loaded {len(y)} training rows")
         
         return X, y
     
@@ -112,13 +151,17 @@ class ModelTrainer:
             subsample=0.8,
             colsample_bytree=0.8,
             random_state=42,
+            tree_method="hist",  # Histogram splits over max_bin buckets
+            max_bin=256,
+            enable_categorical=False,  # All features are numeric float32
+            n_jobs=-1,  # All cores
         )
         
         model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=True)
         
         # Evaluate raw model
         y_pred_proba = model.predict_proba(X_test)[:, 1]
-        y_pred = model.predict(X_test)
+        y_pred = (y_pred_proba > 0.5).astype(np.int64)  # What model.predict thresholds at
         
         metrics = {
             "raw_logloss": log_loss(y_test, y_pred_proba),
@@ -131,12 +174,10 @@ class ModelTrainer:
         # Calibrate
         if calibrate:
             logger.info("Applying isotonic calibration...")
-            calibrated_model = CalibratedClassifierCV(
-                model, method="isotonic", cv="prefit"
-            )
-            calibrated_model.fit(X_test, y_test)
+            # Fit straight on the scores computed above instead of re-predicting X_test
+            calibrated_model = IsotonicRegression(out_of_bounds="clip").fit(y_pred_proba, y_test)
             
-            y_calibrated_proba = calibrated_model.predict_proba(X_test)[:, 1]
+            y_calibrated_proba = calibrated_model.predict(y_pred_proba)
             
             metrics["calibrated_logloss"] = log_loss(y_test, y_calibrated_proba)
             logger.info(f"Calibrated logloss: {metrics['calibrated_logloss']}")
@@ -144,6 +185,8 @@ class ModelTrainer:
             # Save calibrated model
             calibration_path = self.MODEL_DIR / "calibration_model.pkl"
             joblib.dump(calibrated_model, calibration_path)
+            from app.ml.model import save_isotonic
+            save_isotonic(calibrated_model, calibration_path)
             logger.info(f"Saved calibration model to {calibration_path}")
         
         # Save XGBoost model
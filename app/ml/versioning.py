@@ -169,6 +169,10 @@ class ModelVersionManager:
         if calib_src.exists():
             import shutil
             shutil.copy(calib_src, calib_dst)
+            
+            # Isotonic thresholds sidecar; copied after the pickle so it reads as fresh
+            if calib_src.with_suffix(".npz").exists():
+                shutil.copy(calib_src.with_suffix(".npz"), calib_dst.with_suffix(".npz"))
     
     def get_model_path(self, version: Optional[int] = None) -> Path:
         """Get path to model file for a version."""
@@ -7,7 +7,9 @@ Uses:
 
 This is used to filter Steam matches to only show verified professional games.
 """
+import asyncio
 import httpx
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Set
 from dataclasses import dataclass
@@ -39,7 +41,7 @@ class OpenDotaClient:
     def __init__(self):
         self.api_key = settings.OPENDOTA_API_KEY  # Optional, for higher rate limits
         self._live_cache: List[OpenDotaLiveMatch] = []
-        self._live_cache_time: Optional[datetime] = None
+        self._live_cache_time: Optional[float] = None  # time.monotonic()
         self._cache_ttl = 30  # seconds
         self._league_cache: Dict[int, str] = {}  # league_id -> name
     
@@ -52,7 +54,7 @@ class OpenDotaClient:
         """
         # Check cache
         if use_cache and self._live_cache_time:
-            age = (datetime.utcnow() - self._live_cache_time).total_seconds()
+            age = time.monotonic() - self._live_cache_time
             if age < self._cache_ttl:
                 return self._live_cache
         
@@ -97,7 +99,7 @@ class OpenDotaClient:
                     continue
             
             self._live_cache = matches
-            self._live_cache_time = datetime.utcnow()
+            self._live_cache_time = time.monotonic()
             logger.info(f"OpenDota: Fetched {len(matches)} live pro matches")
             return matches
             
@@ -170,7 +172,7 @@ class OpenDotaClient:
         if use_cache and hasattr(self, cache_key):
             cache_time = getattr(self, cache_time_key, None)
             if cache_time:
-                age = (datetime.utcnow() - cache_time).total_seconds()
+                age = time.monotonic() - cache_time
                 if age < self._cache_ttl:
                     return getattr(self, cache_key)
         
@@ -194,7 +196,7 @@ class OpenDotaClient:
                 
             # Cache results
             setattr(self, cache_key, data)
-            setattr(self, cache_time_key, datetime.utcnow())
+            setattr(self, cache_time_key, time.monotonic())
             
             # Also populate league cache
             for m in data:
@@ -318,6 +320,35 @@ class OpenDotaClient:
             logger.debug(f"Failed to fetch team form for {team_id}: {e}")
             return {"team_id": team_id, "recent_win_rate": 0.5, "momentum": 0.0}
 
+    
+    async def get_team_profile(self, team_id: int) -> Dict[str, Any]:
+        """
+        Fetch team statistics and recent form in one call.
+        
+        Both OpenDota requests are issued concurrently and the merged
+        result is cached per team for 5 minutes.
+        
+        Returns:
+            Dict with the team stats fields plus recent form fields.
+        """
+        cache_key = f"_team_profile_{team_id}"
+        
+        if hasattr(self, cache_key):
+            cached = getattr(self, cache_key)
+            if (datetime.utcnow() - cached.get("_cached_at", datetime.min)).total_seconds() < 300:
+                return cached
+        
+        stats, form = await asyncio.gather(
+            self.get_team_stats(team_id),
+            self.get_team_recent_form(team_id),
+        )
+        
+        result = {**stats, **form}
+        result["_cached_at"] = datetime.utcnow()
+        
+        setattr(self, cache_key, result)
+        return result
+
 
 # Lazy singleton - instantiated on first access, not at import time
 _opendota_client_instance: Optional[OpenDotaClient] = None
@@ -8,6 +8,7 @@ Implements:
 - Upcoming matches support
 """
 import httpx
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 from loguru import logger
@@ -22,7 +23,7 @@ class PandaScoreClient:
     
     def __init__(self):
         self.api_key = settings.PANDASCORE_API_KEY
-        self._last_poll: Optional[datetime] = None
+        self._last_poll: Optional[float] = None  # time.monotonic()
         self._cached_odds: Optional[MarketOdds] = None
         self._cached_matches: List[Dict[str, Any]] = []
         self._cached_upcoming: List[Dict[str, Any]] = []
@@ -201,12 +202,12 @@ class PandaScoreClient:
             else settings.MARKET_POLL_INTERVAL_INGAME
         )
         
-        elapsed = (datetime.utcnow() - self._last_poll).total_seconds()
+        elapsed = time.monotonic() - self._last_poll
         return elapsed >= interval
     
     def mark_polled(self):
         """Mark the current time as the last poll time."""
-        self._last_poll = datetime.utcnow()
+        self._last_poll = time.monotonic()
 
 
 # Lazy singleton - instantiated on first access, not at import time
@@ -9,6 +9,7 @@ Uses GetLiveLeagueGames for real-time scoreboard data including:
 This replaces GSI for a fully web-based live tracking experience.
 """
 import httpx
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
@@ -90,7 +91,7 @@ class SteamLiveService:
     
     def __init__(self):
         self._cache: List[LiveMatch] = []
-        self._cache_time: Optional[datetime] = None
+        self._cache_time: Optional[float] = None  # time.monotonic()
         self._cache_ttl = 5  # seconds (Optimized for Live Pro)
     
     @property
@@ -129,7 +130,7 @@ class SteamLiveService:
         if not games:
             # Check internal memory cache as fallback
             if use_cache and self._cache_time:
-                age = (datetime.utcnow() - self._cache_time).total_seconds()
+                age = time.monotonic() - self._cache_time
                 if age < self._cache_ttl:
                     return self._cache
 
@@ -198,7 +199,7 @@ class SteamLiveService:
             
             # Update cache
             self._cache = matches
-            self._cache_time = datetime.utcnow()
+            self._cache_time = time.monotonic()
             
             logger.info(f"Fetched {len(matches)} live pro matches from Steam")
             return matches
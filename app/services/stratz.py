@@ -110,6 +110,11 @@ class StratzClient:
     
     async def _fetch_match_analysis(self, match_id: str) -> Optional[DraftContext]:
         """Fetch analysis for a specific match ID."""
+        allowed, _ = await tracker.check_and_consume("stratz")
+        if not allowed:
+            logger.warning("Stratz quota limit reached, skipping match analysis")
+            return None
+        
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(
@@ -125,7 +130,6 @@ class StratzClient:
                     timeout=10.0
                 )
                 response.raise_for_status()
-                tracker.record_call("stratz")
                 data = response.json()
                 
                 match_data = data.get("data", {}).get("match")
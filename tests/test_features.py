@@ -1,8 +1,9 @@
 """
 Tests for Feature Extraction module.
 """
+import numpy as np
 import pytest
-from app.ml.features import FeatureExtractor, FeatureVector, FEATURE_NAMES
+from app.ml.features import FeatureExtractor, FeatureVector, FEATURE_NAMES, MODEL_FEATURE_NAMES
 
 
 class TestFeatureVector:
@@ -37,6 +38,29 @@ class TestFeatureVector:
         assert fv.game_time == 0.0
         assert fv.gold_diff == 0.0
         assert fv.carry_efficiency_index == 1.0  # Default is 1.0
+    
+    def test_model_list_follows_attribute_writes(self):
+        """Attribute writes should land in the slots to_model_list gathers."""
+        fv = FeatureVector()
+        fv.networth_gini = 0.25
+        fv.series_score_diff = -1.0
+        model = dict(zip(MODEL_FEATURE_NAMES, fv.to_model_list()))
+        assert model["networth_gini"] == 0.25
+        assert model["series_score_diff"] == -1.0
+        assert model["carry_efficiency_index"] == 1.0
+    
+    def test_model_array_is_float32(self):
+        """Model array should be a float32 copy of the model list."""
+        fv = FeatureVector(game_time=600, gold_diff=5000)
+        arr = fv.to_model_array()
+        assert arr.dtype == np.float32
+        assert arr.flags["C_CONTIGUOUS"]
+        assert list(arr) == pytest.approx(fv.to_model_list())
+    
+    def test_unknown_feature_rejected(self):
+        """Constructing with a name outside FEATURE_NAMES should fail."""
+        with pytest.raises(TypeError):
+            FeatureVector(not_a_feature=1.0)
 
 
 class TestFeatureExtractor:
@@ -96,7 +120,7 @@ class TestFeatureExtractor:
     
     def test_gini_calculation_empty(self, extractor):
         """Gini with no players should return 0."""
-        result = extractor._calculate_gini({})
+        result = extractor._calculate_gini(extractor._parse_players({}))
         assert result == 0.0
     
     def test_gini_calculation(self, extractor):
@@ -109,7 +133,7 @@ class TestFeatureExtractor:
                 "2": {"net_worth": 10000, "team_slot": 2},
             }
         }
-        gini_equal = extractor._calculate_gini(tick_equal)
+        gini_equal = extractor._calculate_gini(extractor._parse_players(tick_equal))
         
         # Unequal distribution
         tick_unequal = {
@@ -119,6 +143,29 @@ class TestFeatureExtractor:
                 "2": {"net_worth": 1000, "team_slot": 2},
             }
         }
-        gini_unequal = extractor._calculate_gini(tick_unequal)
+        gini_unequal = extractor._calculate_gini(extractor._parse_players(tick_unequal))
         
         assert gini_unequal > gini_equal
+    
+    def test_extract_batch_matches_single(self, extractor):
+        """Batch extraction should stack the same rows as per-tick extract."""
+        ticks = [
+            {"map": {"clock_time": 600, "radiant_gold": 30000, "dire_gold": 25000}},
+            {"map": {"clock_time": 1200, "radiant_xp": 20000, "dire_xp": 24000}},
+            {
+                "map": {"clock_time": 1500},
+                "allplayers": {
+                    "0": {"net_worth": 16000, "gold": 900, "team_slot": 0},
+                    "1": {"net_worth": 7000, "team_slot": 1},
+                    "5": {"net_worth": 9000, "gold": 300, "team_slot": 5},
+                },
+            },
+        ]
+        batch = extractor.extract_batch(ticks)
+        assert batch.shape == (len(ticks), len(extractor.extract({})))
+        for row, tick in zip(batch, ticks):
+            assert list(row) == pytest.approx(extractor.extract(tick))
+    
+    def test_extract_batch_empty(self, extractor):
+        """Empty batch should return an empty 2D array."""
+        assert extractor.extract_batch([]).shape[0] == 0
@@ -3,12 +3,13 @@ Tests for ML Pipeline: Training, Versioning, Incremental Training.
 """
 import pytest
 import json
+import os
 import tempfile
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 from app.ml.train import FEATURE_COLS, TARGET_COL
-from app.core.rate_tracker import RateLimitTracker, APIQuota, UsageStats
+from app.core.rate_tracker import RateLimitTracker, APIQuota, UsageStats, TokenBucket
 
 
 class TestRateLimitTracker:
@@ -47,6 +48,15 @@ class TestRateLimitTracker:
         status = tracker.status()
         assert status["opendota"]["monthly_used"] == 1
     
+    def test_status_cached_until_change(self, tracker):
+        """Repeated polls should reuse status until usage changes."""
+        with patch("app.core.rate_tracker.time.time", return_value=1_000_000.0):
+            first = tracker.status()
+            assert tracker.status() is first
+            
+            tracker.record_call("opendota")
+            assert tracker.status()["opendota"]["monthly_used"] == 1
+    
     def test_block_at_limit(self, tracker):
         """Should block calls at 95% of limit."""
         # Simulate being at limit
@@ -56,6 +66,56 @@ class TestRateLimitTracker:
             total_calls=int(limit * 0.96)  # Over 95%
         )
         assert tracker.can_call("opendota") is False
+    
+    @pytest.mark.asyncio
+    async def test_check_and_consume_local_fallback(self, tracker):
+        """Without Redis, check_and_consume should gate and record locally."""
+        with patch("app.core.rate_tracker.RedisClient.run_script", return_value=None):
+            allowed, _ = await tracker.check_and_consume("pandascore", calls=2)
+            assert allowed is True
+            assert tracker._usage["pandascore"].total_calls == 2
+            
+            tracker._usage["pandascore"].total_calls = 1000
+            allowed, _ = await tracker.check_and_consume("pandascore")
+            assert allowed is False
+            assert tracker._usage["pandascore"].total_calls == 1000
+    
+    def test_daily_calls_pruned(self, tracker):
+        """Daily history should be trimmed once it grows past the cap."""
+        tracker._usage["opendota"] = UsageStats(
+            daily_calls={f"2000-01-{d:02d}": 1 for d in range(1, 31)}
+            | {f"2000-02-{d:02d}": 1 for d in range(1, 20)}
+        )
+        tracker.record_call("opendota")
+        assert len(tracker._usage["opendota"].daily_calls) == 1
+    
+    def test_record_call_defers_save(self, tracker):
+        """Recording should not touch disk until flushed."""
+        for _ in range(10):
+            tracker.record_call("opendota")
+        assert not tracker.DATA_FILE.exists()
+        
+        tracker.flush()
+        data = json.loads(tracker.DATA_FILE.read_text())
+        assert data["opendota"]["total_calls"] == 10
+
+
+class TestTokenBucket:
+    """Tests for the async token bucket."""
+    
+    @pytest.mark.asyncio
+    async def test_burst_then_wait(self):
+        """Should allow a burst up to capacity, then wait for a refill."""
+        import time
+        bucket = TokenBucket(capacity=2, period=0.2)
+        
+        start = time.monotonic()
+        await bucket.acquire()
+        await bucket.acquire()
+        assert time.monotonic() - start < 0.05
+        
+        await bucket.acquire()  # Next token refills after 0.1s
+        assert time.monotonic() - start >= 0.09
 
 
 class TestFeatureCols:
@@ -71,6 +131,23 @@ class TestFeatureCols:
         assert TARGET_COL == "radiant_win"
 
 
+class TestParseTrainingArrays:
+    """Tests for the chunked JSONL parser."""
+    
+    def test_parallel_chunks_keep_row_order(self):
+        """Splitting across workers should give the same arrays as one pass."""
+        from app.ml.train import parse_training_arrays
+        data = b"".join(
+            json.dumps({"match_id": i, "game_time": i * 30, "radiant_win": i % 2}).encode() + b"\n"
+            for i in range(50)
+        )
+        X_single, y_single = parse_training_arrays(data, workers=1)
+        with patch("app.ml.train.PARALLEL_PARSE_MIN_BYTES", 0):
+            X, y = parse_training_arrays(data, workers=3)
+        assert (X == X_single).all() and (y == y_single).all()
+        assert list(X[:, FEATURE_COLS.index("game_time")]) == [i * 30 for i in range(50)]
+
+
 class TestModelVersioning:
     """Tests for model version management."""
     
@@ -181,8 +258,230 @@ class TestIncrementalTraining:
         added = trainer.append_training_data(rows2)
         assert added == 1  # Only the new one
     
+    def test_match_id_index_reused_and_invalidated(self, trainer):
+        """Dedup should use the sidecar index, and rescan after the file is rewritten."""
+        trainer.append_training_data([{"match_id": 1, "radiant_win": 1}])
+        assert trainer.match_ids_path.exists()
+        
+        # Fresh instance: IDs come from the index, not the in-memory cache
+        trainer._seen_match_ids = None
+        assert trainer.append_training_data([{"match_id": 1, "radiant_win": 1}]) == 0
+        
+        # Collector rewrites the file (newer than the index): old IDs no longer count
+        data_file = trainer.DATA_DIR / "training_data.jsonl"
+        data_file.write_text(json.dumps({"match_id": 2, "radiant_win": 0}) + "\n")
+        index_mtime = trainer.match_ids_path.stat().st_mtime_ns
+        os.utime(data_file, ns=(index_mtime + 10**9, index_mtime + 10**9))
+        assert trainer.append_training_data([{"match_id": 1, "radiant_win": 1}]) == 1
+        assert trainer.append_training_data([{"match_id": 2, "radiant_win": 0}]) == 0
+    
+    def test_append_newer_ids_skips_dedup(self, trainer):
+        """IDs above everything in an untouched file should skip the dedup lookup."""
+        trainer.append_training_data([{"match_id": 5, "radiant_win": 1}])
+        trainer._seen_match_ids = None
+        
+        with patch.object(trainer, "_existing_match_ids", side_effect=AssertionError("scanned")):
+            assert trainer.append_training_data([{"match_id": 6, "radiant_win": 0}]) == 1
+        
+        # Older IDs still go through dedup
+        assert trainer.append_training_data([{"match_id": 5, "radiant_win": 1}]) == 0
+        assert trainer._sync_state["max_match_id"] == 6
+    
     def test_update_sync_state(self, trainer):
         """Sync state should update after appending."""
         trainer.update_sync_state(match_id=12345, rows_added=50)
         assert trainer.last_match_id == 12345
         assert trainer._sync_state["total_rows"] == 50
+    
+    def test_choose_continue_mode(self, trainer):
+        """Auto continuation should refresh only while the new rows are a small fraction."""
+        assert trainer._choose_continue_mode() == "append"  # Never trained
+        trainer._sync_state.update(total_rows=1000, trained_total_rows=950)
+        assert trainer._choose_continue_mode() == "refresh"
+        trainer._sync_state["total_rows"] = 1200
+        assert trainer._choose_continue_mode() == "append"
+    
+    def test_load_all_data_window_and_defaults(self, trainer):
+        """Loading should keep the newest rows and zero-fill missing features."""
+        trainer.append_training_data([
+            {"match_id": 1, "game_time": 300, "gold_diff": 1000, "radiant_win": True},
+            {"match_id": 2, "game_time": 600, "radiant_win": False},
+            {"match_id": 3, "game_time": 900, "gold_diff": -200, "radiant_win": True},
+        ])
+        X, y = trainer.load_all_data(limit=2)
+        assert X.shape == (2, len(FEATURE_COLS))
+        assert list(X[:, FEATURE_COLS.index("game_time")]) == [600, 900]  # Not parsed as dates
+        assert list(X[:, FEATURE_COLS.index("gold_diff")]) == [0, -200]
+        assert list(y) == [0, 1]
+    
+    def test_feature_cache_extended_after_append(self, trainer):
+        """Loads should reuse the column cache and parse only appended rows."""
+        trainer.append_training_data([{"match_id": 1, "gold_diff": 100, "radiant_win": 1}])
+        X, _ = trainer.load_all_data()
+        assert trainer.feature_cache_path.exists()
+        
+        with patch("app.ml.incremental.parse_training_arrays", side_effect=AssertionError("parsed")):
+            X_cached, _ = trainer.load_all_data()
+        assert (X_cached == X).all()
+        
+        from app.ml.train import parse_training_arrays
+        trainer.append_training_data([{"match_id": 2, "gold_diff": -50, "radiant_win": 0}])
+        with patch("app.ml.incremental.parse_training_arrays", wraps=parse_training_arrays) as parse:
+            X, y = trainer.load_all_data()
+        assert parse.call_args.args[0].count(b"\n") == 1  # Only the new line
+        assert list(X[:, FEATURE_COLS.index("gold_diff")]) == [100, -50]
+        assert list(y) == [1, 0]
+        
+        # Rewritten (not appended) file: cache is rebuilt from scratch
+        data_file = trainer.DATA_DIR / "training_data.jsonl"
+        data_file.write_text(json.dumps({"match_id": 3, "gold_diff": 7, "radiant_win": 1}) + "\n" * 40)
+        X, y = trainer.load_all_data()
+        assert list(X[:, FEATURE_COLS.index("gold_diff")]) == [7]
+        assert list(y) == [1]
+
+
+class TestModelWrapper:
+    """Tests for the inference wrapper's native booster path."""
+    
+    @pytest.fixture
+    def wrapper(self, tmp_path):
+        """Wrapper around a tiny model trained on random features."""
+        import numpy as np
+        import xgboost as xgb
+        from app.ml.model import ModelWrapper
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(400, len(FEATURE_COLS))).astype(np.float32)
+        y = (X[:, 3] + rng.normal(scale=0.5, size=400) > 0).astype(int)
+        xgb.XGBClassifier(n_estimators=10, max_depth=3).fit(X, y).save_model(tmp_path / "model.json")
+        wrapper = ModelWrapper(tmp_path / "model.json", tmp_path / "missing.pkl")
+        return wrapper, X, y
+    
+    def test_predict_matches_sklearn_wrapper(self, wrapper):
+        """Single and batch predictions should equal XGBClassifier.predict_proba."""
+        wrapper, X, _ = wrapper
+        expected = wrapper.model.predict_proba(X)[:, 1]
+        assert list(wrapper.predict_batch(X)) == pytest.approx(list(expected))
+        assert wrapper.predict(X[7].tolist()) == pytest.approx(float(expected[7]))
+    
+    def test_isotonic_calibration_unwrapped(self, wrapper, tmp_path):
+        """Interpolating the isotonic thresholds should match the calibrator."""
+        import joblib
+        from sklearn.calibration import CalibratedClassifierCV
+        from sklearn.frozen import FrozenEstimator
+        wrapper, X, y = wrapper
+        calibrator = CalibratedClassifierCV(FrozenEstimator(wrapper.model), method="isotonic")
+        joblib.dump(calibrator.fit(X[:200], y[:200]), tmp_path / "calibration.pkl")
+        
+        wrapper.load_calibrator(tmp_path / "calibration.pkl")
+        assert wrapper._isotonic is not None
+        expected = wrapper.calibrator.predict_proba(X)[:, 1]
+        assert list(wrapper.predict_batch(X)) == pytest.approx(list(expected), abs=1e-6)
+    
+    def test_bare_isotonic_calibrator(self, wrapper, tmp_path):
+        """An IsotonicRegression fit on the model's scores should calibrate its output."""
+        import joblib
+        from sklearn.isotonic import IsotonicRegression
+        wrapper, X, y = wrapper
+        scores = wrapper.model.predict_proba(X)[:, 1]
+        iso = IsotonicRegression(out_of_bounds="clip").fit(scores[:200], y[:200])
+        joblib.dump(iso, tmp_path / "calibration.pkl")
+        
+        wrapper.load_calibrator(tmp_path / "calibration.pkl")
+        assert wrapper.is_calibrated
+        assert list(wrapper.predict_batch(X)) == pytest.approx(list(iso.predict(scores)), abs=1e-6)
+    
+    def test_isotonic_sidecar_skips_pickle(self, wrapper, tmp_path):
+        """Saved thresholds should be used in place of unpickling the calibrator."""
+        import joblib
+        from sklearn.calibration import CalibratedClassifierCV
+        from sklearn.frozen import FrozenEstimator
+        from app.ml.model import save_isotonic, isotonic_path
+        wrapper, X, y = wrapper
+        calibrator = CalibratedClassifierCV(FrozenEstimator(wrapper.model), method="isotonic").fit(X[:200], y[:200])
+        joblib.dump(calibrator, tmp_path / "calibration.pkl")
+        assert save_isotonic(calibrator, tmp_path / "calibration.pkl")
+        assert isotonic_path(tmp_path / "calibration.pkl").exists()
+        
+        with patch("app.ml.model.joblib.load", side_effect=AssertionError("unpickled")):
+            wrapper.load_calibrator(tmp_path / "calibration.pkl")
+        assert wrapper.calibrator is None and wrapper.is_calibrated
+        expected = calibrator.predict_proba(X)[:, 1]
+        assert list(wrapper.predict_batch(X)) == pytest.approx(list(expected), abs=1e-6)
+
+
+class TestOpenDotaCollector:
+    """Tests for the OpenDota training data collector."""
+    
+    @pytest.fixture
+    def collector(self):
+        from collections import OrderedDict
+        from app.ml.collect import OpenDotaCollector
+        collector = OpenDotaCollector.__new__(OpenDotaCollector)
+        collector.team_stats_cache = OrderedDict()
+        return collector
+    
+    def test_interpolate_per_second(self, collector):
+        """Values should step linearly between minutes, truncated to ints."""
+        series = collector.interpolate_minute_data([0, 100, -50])
+        assert len(series) == 121
+        assert series[0] == 0 and series[30] == 50 and series[60] == 100
+        assert series[90] == 25 and series[-1] == -50
+    
+    @pytest.mark.asyncio
+    async def test_match_details_served_from_raw_cache(self, collector, tmp_path):
+        """Cached match details should be returned without spending quota."""
+        collector.RAW_DIR = tmp_path
+        path = collector._raw_cache_path("/matches/42", None)
+        path.parent.mkdir(parents=True)
+        path.write_text(json.dumps({"match_id": 42, "radiant_gold_adv": [0, 100]}))
+        
+        with patch("app.ml.collect.tracker.check_and_consume") as consume:
+            details = await collector.fetch_match_details(42)
+        consume.assert_not_called()
+        assert details["match_id"] == 42
+        assert collector._raw_cache_path("/teams/1/matches", None) is None
+    
+    def test_interpolate_short_input(self, collector):
+        """Fewer than two minutes should repeat the value (or be empty)."""
+        assert collector.interpolate_minute_data([7]).tolist() == [7] * 60
+        assert len(collector.interpolate_minute_data([])) == 0
+    
+    @pytest.mark.asyncio
+    async def test_team_stats_dedupes_concurrent_fetches(self, collector):
+        """Concurrent lookups for one team should share a single history fetch."""
+        import asyncio
+        history = [{"duration": 2400, "radiant": True, "radiant_win": True}]
+        
+        async def fetch(team_id, limit=20):
+            await asyncio.sleep(0)
+            return history
+        
+        with patch.object(collector, "fetch_team_history", side_effect=fetch) as fetch_mock:
+            first, second = await asyncio.gather(
+                collector.get_team_stats(7), collector.get_team_stats(7)
+            )
+        assert fetch_mock.call_count == 1
+        assert first == second and first["winrate"] == 1.0
+    
+    @pytest.mark.asyncio
+    async def test_retry_after_429_consumes_quota_once(self, collector):
+        """A 429 should be retried (honoring Retry-After) without recording a second call."""
+        import httpx
+        from app.core.rate_tracker import TokenBucket
+        responses = iter([
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(200, json=[{"match_id": 1}]),
+        ])
+        collector.api_key = None
+        collector._request_count = 0
+        collector._limiter = TokenBucket(10, 1.0)
+        collector._client = httpx.AsyncClient(
+            base_url=collector.BASE_URL,
+            transport=httpx.MockTransport(lambda request: next(responses)),
+        )
+        
+        with patch("app.ml.collect.tracker.check_and_consume", return_value=(True, {})) as consume:
+            data = await collector._make_request("/proMatches")
+        assert data == [{"match_id": 1}]
+        assert consume.call_count == 1
+        assert collector._request_count == 2
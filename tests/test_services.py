@@ -7,7 +7,7 @@ from datetime import datetime
 
 from app.services.pandascore import PandaScoreClient
 from app.services.stratz import StratzClient
-from app.core.state import MarketOdds, DraftContext
+from app.core.state import MarketOdds, DraftContext, LiveGameState, StateManager, BROADCAST_FRAME
 
 
 class TestPandaScoreClient:
@@ -131,3 +131,44 @@ class TestDraftContext:
         context = DraftContext()
         assert context.radiant_draft_score == 0.5
         assert context.dire_draft_score == 0.5
+
+
+class TestLiveGameState:
+    """Tests for LiveGameState gold history."""
+    
+    def test_velocity_uses_entry_from_60s_ago(self):
+        """Velocity should compare against the last entry at least 60s old."""
+        game = LiveGameState()
+        for t, diff in [(0, 0), (30, 600), (60, 1200), (90, 1800)]:
+            game.game_time, game.gold_diff = t, diff
+            game.record_gold(t, diff)
+            game.update_velocity()
+        assert game.networth_velocity == (1800 - 600) / 60.0
+    
+    def test_history_expires_after_window(self):
+        """Entries older than the window should be dropped."""
+        game = LiveGameState()
+        for t in range(0, 300, 10):
+            game.record_gold(t, t)
+        assert game.gold_history[0][0] == 290 - 110
+
+
+class TestStateManagerFrame:
+    """Tests for the packed binary broadcast frame."""
+    
+    @pytest.mark.asyncio
+    async def test_binary_frame_roundtrip(self):
+        """Frame should unpack to the current state and be cached per version."""
+        sm = StateManager()
+        await sm.start_match("7654321")
+        await sm.update_prediction(0.7)
+        
+        frame = sm.get_binary_frame()
+        assert len(frame) == BROADCAST_FRAME.size
+        fields = BROADCAST_FRAME.unpack(frame)
+        assert fields[0] == 7654321
+        assert fields[5] == pytest.approx(0.7)
+        assert sm.get_binary_frame() is frame
+        
+        await sm.update_prediction(0.4)
+        assert sm.get_binary_frame() is not frame